@@ -0,0 +1,170 @@
+"""
+Benchmarks for degrees.
+
+    python benchmark.py search [directory] [--queries N] [--compact]
+    python benchmark.py ingest [directory] [--workers N]
+    python benchmark.py generate directory [--stars N]
+
+times the one-sided BFS against the bidirectional search on random pairs
+and checks that both find paths of the same length. With --neighbor-cache N
+both searches go through an N-entry co-star LRU, whose hit and miss counts
+are reported.
+
+`ingest` reports rows/sec for each CSV with csv.DictReader, csv.reader and
+the chunked parallel reader, then times full loads. `generate` writes a
+synthetic dataset (10M stars rows by default) to benchmark against.
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import time
+
+import degrees
+from graph import CompactGraph
+from ingest import read_tables
+
+
+def bench_search(args):
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=args.compact)
+    if args.neighbor_cache:
+        degrees.enable_neighbor_cache(max_entries=args.neighbor_cache)
+    if degrees.graph is not None:
+        person_ids = list(degrees.graph.person_ids)
+    else:
+        person_ids = list(degrees.people)
+
+    rng = random.Random(args.seed)
+    pairs = [tuple(rng.sample(person_ids, 2)) for _ in range(args.queries)]
+
+    lengths = {}
+    for label, bidirectional in (("bfs", False), ("bidirectional", True)):
+        start = time.perf_counter()
+        lengths[label] = [
+            path_length(degrees.shortest_path(source, target,
+                                              bidirectional=bidirectional))
+            for source, target in pairs
+        ]
+        elapsed = time.perf_counter() - start
+        print(f"{label:>14}: {elapsed:.3f}s total, "
+              f"{1000 * elapsed / len(pairs):.2f}ms/query")
+
+    mismatches = sum(a != b for a, b in zip(lengths["bfs"], lengths["bidirectional"]))
+    print(f"{len(pairs)} queries, {mismatches} length mismatches")
+    if degrees.neighbor_cache is not None:
+        print("neighbor cache:", degrees.neighbor_cache.stats())
+
+
+def path_length(path):
+    return None if path is None else len(path)
+
+
+def bench_ingest(args):
+    widths = {"people.csv": 3, "movies.csv": 3, "stars.csv": 2}
+    for name, width in widths.items():
+        path = os.path.join(args.directory, name)
+
+        def dict_reader():
+            with open(path, encoding="utf-8") as f:
+                return sum(1 for _ in csv.DictReader(f))
+
+        def tuple_reader():
+            with open(path, encoding="utf-8") as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                return sum(1 for _ in reader)
+
+        def parallel_reader():
+            with multiprocessing.Pool(args.workers) as pool:
+                (columns,) = read_tables(pool, [(path, width)], 4 * args.workers)
+            return len(columns[0])
+
+        for label, reader in (("DictReader", dict_reader),
+                              ("reader", tuple_reader),
+                              (f"parallel x{args.workers}", parallel_reader)):
+            start = time.perf_counter()
+            rows = reader()
+            report(f"{name} {label}", rows, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    degrees.load_data(args.directory)
+    print(f"{'load_data (dicts)':>28}: {time.perf_counter() - start:.3f}s")
+    for workers in sorted({1, args.workers}):
+        start = time.perf_counter()
+        CompactGraph.from_csv(args.directory, workers=workers)
+        print(f"{f'from_csv x{workers}':>28}: {time.perf_counter() - start:.3f}s")
+
+
+def report(label, rows, elapsed):
+    rate = rows / elapsed if elapsed else float("inf")
+    print(f"{label:>28}: {rows} rows in {elapsed:.3f}s, {rate:,.0f} rows/sec")
+
+
+def generate(args):
+    """
+    Writes people.csv, movies.csv and stars.csv with random casts.
+    """
+    rng = random.Random(args.seed)
+    os.makedirs(args.directory, exist_ok=True)
+    people = args.people or max(1, args.stars // 3)
+    movies = args.movies or max(1, args.stars // 8)
+
+    with open(os.path.join(args.directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        writer.writerows((i, f"Person {i}", 1900 + i % 120)
+                         for i in range(1, people + 1))
+
+    with open(os.path.join(args.directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        writer.writerows((i, f"Movie {i}", 1900 + i % 120)
+                         for i in range(1, movies + 1))
+
+    with open(os.path.join(args.directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        writer.writerows((rng.randint(1, people), rng.randint(1, movies))
+                         for _ in range(args.stars))
+    print(f"Wrote {people} people, {movies} movies and {args.stars} stars "
+          f"to {args.directory}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmark.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="BFS vs bidirectional search")
+    search.add_argument("directory", nargs="?", default="large")
+    search.add_argument("--queries", type=int, default=100)
+    search.add_argument("--seed", type=int, default=0)
+    search.add_argument("--compact", action="store_true")
+    search.add_argument("--neighbor-cache", type=int, default=0, metavar="N",
+                        help="co-star LRU entries for both searches")
+    search.set_defaults(run=bench_search)
+
+    ingest = commands.add_parser("ingest", help="CSV parsing throughput")
+    ingest.add_argument("directory", nargs="?", default="large")
+    ingest.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ingest.set_defaults(run=bench_ingest)
+
+    synthetic = commands.add_parser("generate", help="write a synthetic dataset")
+    synthetic.add_argument("directory")
+    synthetic.add_argument("--stars", type=int, default=10_000_000)
+    synthetic.add_argument("--people", type=int, default=0)
+    synthetic.add_argument("--movies", type=int, default=0)
+    synthetic.add_argument("--seed", type=int, default=0)
+    synthetic.set_defaults(run=generate)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
+import argparse
 import csv
+import json
+import multiprocessing
+import os
+import queue
 import sys
+import threading
+import time
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import INDEX, CompactGraph, histogram, load_cached, trace_path
+from landmarks import load_index
+from util import Node, StackFrontier, QueueFrontier, NeighborCache
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,56 +21,131 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Integer-indexed CSR graph used in place of the dicts above when
+# the data is loaded with compact=True
+graph = None
 
-def load_data(directory):
+# Optional landmark index over `graph`, used for A* searches
+landmark_index = None
+
+# Optional LRU of deduplicated co-stars, through which every search except
+# the landmark A* expands people
+neighbor_cache = None
+
+
+def load_data(directory, compact=False, cache=True, workers=1):
     """
     Load data from CSV files into memory.
+
+    With `compact`, builds the integer-indexed graph instead, reusing the
+    binary snapshot in `directory` unless `cache` is False, and parsing on
+    `workers` processes when the CSVs have to be read.
     """
+    global graph
+    if compact:
+        if cache:
+            graph = load_cached(directory, workers=workers)
+        else:
+            graph = CompactGraph.from_csv(directory, workers=workers)
+        return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
+        reader = csv.reader(f)
+        next(reader, None)
         for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
+            # Skip blank or malformed rows, as DictReader did
+            if len(row) != 3:
+                continue
+            person_id, name, birth = row
+            people[person_id] = {
+                "name": name,
+                "birth": birth,
                 "movies": set()
             }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
+            if name.lower() not in names:
+                names[name.lower()] = {person_id}
             else:
-                names[row["name"].lower()].add(row["id"])
+                names[name.lower()].add(person_id)
 
     # Load movies
     with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
+        reader = csv.reader(f)
+        next(reader, None)
         for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
+            if len(row) != 3:
+                continue
+            movie_id, title, year = row
+            movies[movie_id] = {
+                "title": title,
+                "year": year,
                 "stars": set()
             }
 
     # Load stars
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
+        reader = csv.reader(f)
+        next(reader, None)
         for row in reader:
+            if len(row) != 2:
+                continue
+            person_id, movie_id = row
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                people[person_id]["movies"].add(movie_id)
+                movies[movie_id]["stars"].add(person_id)
             except KeyError:
                 pass
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(prog="degrees.py")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--compact", action="store_true",
+                        help="use the integer-indexed graph")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="with --compact, always re-parse the CSVs")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both ends at once")
+    parser.add_argument("--landmarks", type=int, default=0, metavar="K",
+                        help="with --compact, use A* over a K-landmark index")
+    parser.add_argument("--neighbor-cache", type=int, default=0, metavar="N",
+                        help="keep co-stars of the last N people expanded, "
+                             "across queries with --batch")
+    parser.add_argument("--separation", metavar="NAME",
+                        help="print how many people are each number of degrees "
+                             "from NAME")
+    parser.add_argument("--to", metavar="NAME",
+                        help="with --separation, also count the shortest paths "
+                             "to NAME")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer tab-separated name pairs from FILE "
+                             "('-' for stdin) as JSON lines")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes for --batch queries and for "
+                             "parsing the CSVs with --compact")
+    args = parser.parse_args()
+
+    if args.batch is not None:
+        run_batch(args.directory, args.batch, args.workers,
+                  cache=not args.no_cache, neighbor_cache_size=args.neighbor_cache)
+        return
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory, compact=args.compact, cache=not args.no_cache,
+              workers=args.workers)
+    if args.landmarks:
+        if graph is None:
+            sys.exit("--landmarks requires --compact")
+        load_landmarks(args.directory, args.landmarks)
+    if args.neighbor_cache:
+        enable_neighbor_cache(max_entries=args.neighbor_cache)
     print("Data loaded.")
 
+    if args.separation is not None:
+        print_separation(args.separation, args.to)
+        return
+
     source = person_id_for_name(input("Name: "))
     if source is None:
         sys.exit("Person not found.")
@@ -69,7 +153,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, bidirectional=args.bidirectional)
 
     if path is None:
         print("Not connected.")
@@ -78,13 +162,301 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_record(path[i][1])["name"]
+            person2 = person_record(path[i + 1][1])["name"]
+            movie = movie_record(path[i + 1][0])["title"]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def enable_neighbor_cache(max_entries=None, max_bytes=None):
+    """
+    Memoises co-stars of recently searched people in a bounded LRU,
+    over whichever store is loaded.
+    """
+    global neighbor_cache
+    if graph is not None:
+        neighbor_cache = NeighborCache(graph.neighbors, max_entries, max_bytes,
+                                       typecode=INDEX)
+    else:
+        neighbor_cache = NeighborCache(stored_neighbors, max_entries, max_bytes)
+
+
+def load_landmarks(directory, k):
+    """
+    Loads (or builds and saves) a `k`-landmark index for the compact graph.
+    """
+    global landmark_index
+    landmark_index = load_index(graph, directory, k)
+
+
+def run_batch(directory, filename, workers=1, cache=True, chunk_size=10000,
+              chunk_seconds=0.1, neighbor_cache_size=0):
+    """
+    Answers every "source<TAB>target" line of `filename` and streams one
+    JSON object per line to stdout.
+
+    Loads the compact graph once, groups each chunk of queries by source
+    so one BFS tree answers all of that source's targets, and spreads the
+    groups over a process pool. Workers share the graph: forked workers
+    inherit it copy-on-write, and otherwise each maps the same snapshot.
+
+    A chunk ends after `chunk_size` lines or `chunk_seconds` after its
+    first line, so a slow stream is still answered promptly, and output
+    is flushed after every group.
+
+    With `neighbor_cache_size`, each process keeps co-stars of that many
+    people across queries, and the combined cache stats are printed to
+    stderr at the end.
+    """
+    print("Loading data...", file=sys.stderr)
+    load_data(directory, compact=True, cache=cache, workers=workers)
+    if neighbor_cache_size:
+        enable_neighbor_cache(max_entries=neighbor_cache_size)
+    print("Data loaded.", file=sys.stderr)
+
+    stream = sys.stdin if filename == "-" else open(filename, encoding="utf-8")
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, initializer=init_batch_worker,
+                                    initargs=(directory, cache, neighbor_cache_size))
+
+    # Latest cache stats of each process
+    cache_stats = {}
+    try:
+        for chunk in read_chunks(stream, chunk_size, chunk_seconds):
+            groups, errors = group_queries(chunk)
+            for record in errors:
+                print(json.dumps(record))
+            sys.stdout.flush()
+            if pool is not None:
+                results = pool.imap_unordered(answer_group, groups.items())
+            else:
+                results = map(answer_group, groups.items())
+            for records, (pid, stats) in results:
+                for record in records:
+                    print(json.dumps(record))
+                sys.stdout.flush()
+                if stats is not None:
+                    cache_stats[pid] = stats
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if stream is not sys.stdin:
+            stream.close()
+    if cache_stats:
+        print("neighbor cache:", combine_stats(cache_stats.values()),
+              file=sys.stderr)
+
+
+def combine_stats(stats):
+    """
+    Adds up NeighborCache.stats() of several processes.
+    """
+    total = {"entries": 0, "bytes": 0, "hits": 0, "misses": 0, "evictions": 0}
+    for part in stats:
+        for key in total:
+            total[key] += part[key]
+    lookups = total["hits"] + total["misses"]
+    total["hit_rate"] = total["hits"] / lookups if lookups else 0.0
+    return total
+
+
+def read_chunks(stream, chunk_size, chunk_seconds):
+    """
+    Yields lists of (line number, line) pairs from `stream`. A list ends
+    after `chunk_size` lines, or once `chunk_seconds` have passed since its
+    first line arrived. A reader thread does the blocking reads.
+    """
+    lines = queue.Queue(maxsize=chunk_size)
+
+    def read():
+        for numbered in enumerate(stream, start=1):
+            lines.put(numbered)
+        lines.put(None)
+
+    threading.Thread(target=read, daemon=True).start()
+    chunk = []
+    deadline = None
+    while True:
+        try:
+            if chunk:
+                item = lines.get(timeout=max(0, deadline - time.monotonic()))
+            else:
+                item = lines.get()
+        except queue.Empty:
+            yield chunk
+            chunk = []
+            continue
+        if item is None:
+            break
+        if not chunk:
+            deadline = time.monotonic() + chunk_seconds
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def init_batch_worker(directory, cache, neighbor_cache_size):
+    """
+    Makes sure a batch worker has the graph, which forked workers inherit,
+    and starts its own neighbor cache.
+    """
+    if graph is None:
+        load_data(directory, compact=True, cache=cache)
+    if neighbor_cache_size:
+        enable_neighbor_cache(max_entries=neighbor_cache_size)
+
+
+def group_queries(lines):
+    """
+    Resolves numbered "source<TAB>target" lines, returning a dict from
+    source index to its (line, source, target, target index) queries and a
+    list of error records for lines that could not be resolved.
+    """
+    groups = {}
+    errors = []
+    for number, line in lines:
+        line = line.rstrip("\n")
+        if not line.strip():
+            continue
+        fields = line.split("\t")
+        if len(fields) != 2:
+            errors.append({"line": number, "error": "expected two tab-separated names"})
+            continue
+        source, target = fields
+        s, error = resolve_person(source)
+        if error is None:
+            t, error = resolve_person(target)
+        if error is not None:
+            errors.append({"line": number, "source": source, "target": target,
+                           "error": error})
+            continue
+        groups.setdefault(s, []).append((number, source, target, t))
+    return groups, errors
+
+
+def resolve_person(text):
+    """
+    Returns (person index, None) for a name or person_id without prompting,
+    or (None, error message).
+    """
+    person_ids = graph.ids_for_name(text)
+    if len(person_ids) > 1:
+        return None, f"ambiguous name '{text}': {', '.join(person_ids)}"
+    if len(person_ids) == 1:
+        return graph.person_index[person_ids[0]], None
+    p = graph.person_index.get(text)
+    if p is None:
+        return None, f"person not found: '{text}'"
+    return p, None
+
+
+def answer_group(group):
+    """
+    Answers every query for one source from a single BFS tree. Returns the
+    records and (process id, neighbor cache stats or None).
+    """
+    source, queries = group
+    costars = neighbor_cache.costars if neighbor_cache is not None else None
+    parent_person, parent_movie = graph.bfs_tree(
+        source, {t for _, _, _, t in queries}, costars
+    )
+    records = []
+    for number, source_name, target_name, t in queries:
+        record = {"line": number, "source": source_name, "target": target_name,
+                  "degrees": None, "path": None}
+        if t == source:
+            path = graph.loop_path(source)
+        elif parent_person[t] != -1:
+            path = trace_path(parent_person, parent_movie, source, t)
+        else:
+            path = None
+        if path is not None:
+            record["degrees"] = len(path)
+            record["path"] = [[graph.movie_ids[m], graph.person_ids[p]]
+                              for m, p in path]
+        records.append(record)
+    stats = neighbor_cache.stats() if neighbor_cache is not None else None
+    return records, (os.getpid(), stats)
+
+
+def single_source(person_id):
+    """
+    Runs one breadth-first search from a person over whichever store is
+    loaded. Returns (graph, distance, paths) where `distance` and `paths`
+    are integer-indexed arrays over `graph` (see CompactGraph.bfs_layers).
+    """
+    g = graph if graph is not None else CompactGraph.from_dicts(people, movies)
+    distance, paths = g.bfs_layers(g.person_index[person_id])
+    return g, distance, paths
+
+
+def print_separation(name, target_name=None):
+    """
+    Prints the distribution of degrees of separation from a person and,
+    given a target, the number of distinct shortest paths to them.
+    """
+    source = person_id_for_name(name)
+    if source is None:
+        sys.exit("Person not found.")
+    target = None
+    if target_name is not None:
+        target = person_id_for_name(target_name)
+        if target is None:
+            sys.exit("Person not found.")
+
+    g, distance, paths = single_source(source)
+    counts, unreachable = histogram(distance)
+    for degrees, count in enumerate(counts):
+        print(f"{degrees}: {count}")
+    print(f"Not connected: {unreachable}")
+
+    if target is not None:
+        t = g.person_index[target]
+        if distance[t] == -1:
+            print("Not connected.")
+        else:
+            print(f"{distance[t]} degrees of separation, "
+                  f"{paths[t]} shortest paths.")
+
+
+def shortest_path(source, target, bidirectional=False):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        return loop_path(source)
+
+    if bidirectional:
+        if neighbor_cache is not None:
+            expand = neighbor_cache.pairs
+        elif graph is not None:
+            expand = graph.neighbors
+        else:
+            expand = neighbors_for_person
+        if graph is None:
+            return bidirectional_search(source, target, expand)
+        return id_path(bidirectional_search(graph.person_index[source],
+                                            graph.person_index[target],
+                                            expand))
+
+    if landmark_index is not None:
+        return id_path(landmark_index.shortest_path(graph.person_index[source],
+                                                    graph.person_index[target]))
+
+    if graph is not None:
+        costars = neighbor_cache.costars if neighbor_cache is not None else None
+        return id_path(graph.shortest_path(graph.person_index[source],
+                                           graph.person_index[target],
+                                           costars))
+
     already = set()
     start = Node(state=source, parent=None, action=None)
     frontier = QueueFrontier()
@@ -101,10 +473,101 @@ def shortest_path(source, target):
                 answer = recreate_path(node)
                 return answer
             frontier.add(node)
-            
-                
+    return None
+
+
+def loop_path(person_id):
+    """
+    Returns the one-step path from a person to themselves that the
+    breadth-first search finds, or None if they have no movies.
+    """
+    if graph is not None:
+        return id_path(graph.loop_path(graph.person_index[person_id]))
+    movie_ids = people[person_id]["movies"]
+    if not movie_ids:
+        return None
+    return [(next(iter(movie_ids)), person_id)]
+
+
+def id_path(path):
+    """
+    Converts a path of (movie, person) indices of the compact graph to
+    (movie_id, person_id) pairs, passing None through.
+    """
+    if path is None:
+        return None
+    return [(graph.movie_ids[m], graph.person_ids[p]) for m, p in path]
+
+
+def bidirectional_search(source, target, neighbors):
+    """
+    Breadth-first search grown from both `source` and `target`, where
+    `neighbors(person)` yields (movie, person) pairs.
+
+    Each step expands one whole layer of whichever side has the smaller
+    frontier, so the first meeting found lies on a shortest path.
+    Returns the path in the same format as `shortest_path`, or None.
+    """
+    if source == target:
+        return []
+
+    # Each side maps a reached person to (movie, person) one step closer
+    # to that side's root
+    forward = {source: None}
+    backward = {target: None}
+    forward_layer = [source]
+    backward_layer = [target]
+
+    while forward_layer and backward_layer:
+        if len(forward_layer) <= len(backward_layer):
+            layer, parents, others = forward_layer, forward, backward
+        else:
+            layer, parents, others = backward_layer, backward, forward
+
+        next_layer = []
+        meeting = None
+        for person in layer:
+            for movie_id, person_id in neighbors(person):
+                if person_id in parents:
+                    continue
+                parents[person_id] = (movie_id, person)
+                if person_id in others:
+                    meeting = person_id
+                    break
+                next_layer.append(person_id)
+            if meeting is not None:
+                break
 
-    raise NotImplementedError
+        if meeting is not None:
+            return join_paths(forward, backward, meeting)
+
+        if parents is forward:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+
+    return None
+
+
+def join_paths(forward, backward, meeting):
+    """
+    Joins the source half and the target half of a bidirectional search
+    at the person where they met.
+    """
+    path = []
+    person = meeting
+    while forward[person] is not None:
+        movie_id, parent = forward[person]
+        path.append((movie_id, person))
+        person = parent
+    path.reverse()
+
+    person = meeting
+    while backward[person] is not None:
+        movie_id, child = backward[person]
+        path.append((movie_id, child))
+        person = child
+    return path
 
 
 def person_id_for_name(name):
@@ -112,32 +575,72 @@ def person_id_for_name(name):
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    if graph is not None:
+        person_ids = graph.ids_for_name(name)
+    else:
+        person_ids = list(names.get(name.lower(), set()))
+    if len(person_ids) == 0 and graph is not None:
+        person_ids = graph.search_names(name, limit=5)
+        if not person_ids:
+            return None
+        print(f"No exact match for '{name}'. Did you mean:")
+        return choose_person(person_ids)
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
-        for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
-            print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
-        try:
-            person_id = input("Intended Person ID: ")
-            if person_id in person_ids:
-                return person_id
-        except ValueError:
-            pass
-        return None
+        return choose_person(person_ids)
     else:
         return person_ids[0]
 
 
+def choose_person(person_ids):
+    """
+    Lists candidate people and asks which one was intended.
+    """
+    for person_id in person_ids:
+        person = person_record(person_id)
+        name = person["name"]
+        birth = person["birth"]
+        print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
+    try:
+        person_id = input("Intended Person ID: ")
+        if person_id in person_ids:
+            return person_id
+    except ValueError:
+        pass
+    return None
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
+
+    With the neighbor cache enabled, returns one pair per distinct co-star
+    from it.
+    """
+    if neighbor_cache is None:
+        return stored_neighbors(person_id)
+    if graph is None:
+        return set(neighbor_cache.pairs(person_id))
+    return {
+        (graph.movie_ids[m], graph.person_ids[p])
+        for m, p in neighbor_cache.pairs(graph.person_index[person_id])
+    }
+
+
+def stored_neighbors(person_id):
+    """
+    Returns (movie_id, person_id) pairs for a person's co-stars, read
+    from whichever store is loaded.
     """
+    if graph is not None:
+        return {
+            (graph.movie_ids[m], graph.person_ids[p])
+            for m, p in graph.neighbors(graph.person_index[person_id])
+        }
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -145,6 +648,25 @@ def neighbors_for_person(person_id):
             neighbors.add((movie_id, person_id))
     return neighbors
 
+
+def person_record(person_id):
+    """
+    Returns the name and birth of a person from whichever store is loaded.
+    """
+    if graph is not None:
+        return graph.person(person_id)
+    return people[person_id]
+
+
+def movie_record(movie_id):
+    """
+    Returns the title and year of a movie from whichever store is loaded.
+    """
+    if graph is not None:
+        return graph.movie(movie_id)
+    return movies[movie_id]
+
+
 def recreate_path(node):
     path = []
     while node.parent is not None:
@@ -0,0 +1,718 @@
+"""
+Compact, integer-indexed representation of the degrees dataset.
+
+People and movies are interned to dense integers and the bipartite
+person-movie graph is stored as CSR offset/index arrays: the movies of
+person `p` are `person_movies[person_offsets[p]:person_offsets[p + 1]]` and
+the stars of movie `m` are `movie_stars[movie_offsets[m]:movie_offsets[m + 1]]`.
+"""
+
+import csv
+import json
+import mmap
+import multiprocessing
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+from ingest import read_tables
+from namesearch import NameSearch
+
+# Typecode for every index array (4-byte signed int)
+INDEX = "i"
+
+# Typecode for path counts (8-byte unsigned int)
+COUNT = "Q"
+
+# Snapshot file written next to the CSVs, and its format version
+CACHE_NAME = "degrees.cache"
+CACHE_MAGIC = b"DEGREES\x03"
+
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+STRING_TABLES = ("person_ids", "person_names", "person_births",
+                 "movie_ids", "movie_titles", "movie_years", "trigrams")
+INDEX_ARRAYS = ("person_offsets", "person_movies", "movie_offsets",
+                "movie_stars", "person_id_order", "person_name_order",
+                "movie_id_order", "trigram_offsets", "trigram_postings")
+
+
+class CompactGraph():
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_stars,
+                 person_id_order=None, person_name_order=None,
+                 movie_id_order=None, trigrams=None, trigram_offsets=None,
+                 trigram_postings=None):
+        """
+        Create a graph from per-index string tables and CSR arrays.
+
+        The `*_order` arrays are permutations of indices sorted by id or by
+        lower-cased name, and the `trigram*` fields the name search index;
+        they are computed here (the name search on first use) unless a
+        snapshot already provides them.
+        """
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+
+        if person_id_order is None:
+            person_id_order = sorted_order(person_ids)
+        if person_name_order is None:
+            person_name_order = sorted_order(person_names, key=str.lower)
+        if movie_id_order is None:
+            movie_id_order = sorted_order(movie_ids)
+        self.person_id_order = person_id_order
+        self.person_name_order = person_name_order
+        self.movie_id_order = movie_id_order
+
+        # Map ids to indices, and lower-cased names to person indices
+        self.person_index = SortedIndex(person_ids, person_id_order)
+        self.movie_index = SortedIndex(movie_ids, movie_id_order)
+        self.name_index = SortedIndex(person_names, person_name_order,
+                                      key=str.lower)
+
+        self.search_index = None
+        if trigrams is not None:
+            self.search_index = NameSearch(person_names, person_name_order,
+                                           trigrams, trigram_offsets,
+                                           trigram_postings)
+
+        # Keeps a memory-mapped snapshot open for as long as the graph lives
+        self.snapshot = None
+
+    @property
+    def name_search(self):
+        if self.search_index is None:
+            self.search_index = NameSearch.build(self.person_names,
+                                                 self.person_name_order)
+        return self.search_index
+
+    @property
+    def trigrams(self):
+        return self.name_search.keys
+
+    @property
+    def trigram_offsets(self):
+        return self.name_search.offsets
+
+    @property
+    def trigram_postings(self):
+        return self.name_search.postings
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Build a graph from the `people` and `movies` dicts of degrees.
+        """
+        person_ids = list(people)
+        movie_ids = list(movies)
+        movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+        edge_people = array(INDEX)
+        edge_movies = array(INDEX)
+        for p, pid in enumerate(person_ids):
+            for mid in people[pid]["movies"]:
+                edge_people.append(p)
+                edge_movies.append(movie_index[mid])
+        return cls.from_edges(
+            person_ids,
+            [people[pid]["name"] for pid in person_ids],
+            [people[pid]["birth"] for pid in person_ids],
+            movie_ids,
+            [movies[mid]["title"] for mid in movie_ids],
+            [movies[mid]["year"] for mid in movie_ids],
+            edge_people, edge_movies
+        )
+
+    @classmethod
+    def from_csv(cls, directory, workers=1):
+        """
+        Load people.csv, movies.csv and stars.csv from `directory`.
+
+        With several `workers`, people.csv and movies.csv are parsed
+        concurrently in chunks on a process pool. stars.csv is always
+        streamed straight into the edge arrays.
+        """
+        people_csv = f"{directory}/people.csv"
+        movies_csv = f"{directory}/movies.csv"
+        if workers > 1:
+            with multiprocessing.Pool(workers) as pool:
+                people_columns, movie_columns = read_tables(
+                    pool, [(people_csv, 3), (movies_csv, 3)], parts=4 * workers
+                )
+            person_ids, person_names, person_births = people_columns
+            movie_ids, movie_titles, movie_years = movie_columns
+        else:
+            person_ids, person_names, person_births = read_columns(people_csv, 3)
+            movie_ids, movie_titles, movie_years = read_columns(movies_csv, 3)
+
+        person_index = {pid: i for i, pid in enumerate(person_ids)}
+        movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+
+        # Collect edges as two parallel integer arrays, skipping rows that
+        # refer to unknown people or movies; build_csr drops repeated rows
+        edge_people = array(INDEX)
+        edge_movies = array(INDEX)
+        add_person = edge_people.append
+        add_movie = edge_movies.append
+        find_person = person_index.get
+        find_movie = movie_index.get
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if len(row) != 2:
+                    continue
+                p = find_person(row[0])
+                m = find_movie(row[1])
+                if p is None or m is None:
+                    continue
+                add_person(p)
+                add_movie(m)
+
+        return cls.from_edges(
+            person_ids, person_names, person_births,
+            movie_ids, movie_titles, movie_years,
+            edge_people, edge_movies
+        )
+
+    @classmethod
+    def from_edges(cls, person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years,
+                   edge_people, edge_movies):
+        """
+        Build both CSR directions from parallel arrays of (person, movie)
+        edges. Repeated edges are kept once, as the dict loader's sets do.
+        """
+        person_offsets, person_movies = build_csr(
+            len(person_ids), edge_people, edge_movies, len(movie_ids)
+        )
+        movie_offsets, movie_stars = build_csr(
+            len(movie_ids), edge_movies, edge_people, len(person_ids)
+        )
+        return cls(
+            person_ids, person_names, person_births,
+            movie_ids, movie_titles, movie_years,
+            person_offsets, person_movies, movie_offsets, movie_stars
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps a snapshot written by `save`. Arrays and string tables
+        are views into the mapping, so nothing is parsed up front.
+        """
+        with open(path, "rb") as f:
+            snapshot = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = read_header(snapshot)
+        if header is None:
+            snapshot.close()
+            raise ValueError(f"{path} is not a degrees snapshot")
+
+        view = memoryview(snapshot)
+        sections = {}
+        for name, (start, length) in header["sections"].items():
+            sections[name] = view[start:start + length].cast(INDEX)
+
+        fields = {name: sections[name] for name in INDEX_ARRAYS}
+        for name in STRING_TABLES:
+            blob_start, blob_length = header["blobs"][name]
+            fields[name] = StringTable(
+                sections[name + "_offsets"],
+                view[blob_start:blob_start + blob_length]
+            )
+        graph = cls(**fields)
+        graph.snapshot = snapshot
+        return graph
+
+    def save(self, path, sources=None):
+        """
+        Writes the graph to `path` as a header followed by 8-byte aligned
+        raw sections. `sources` records the CSV stats the snapshot was
+        built from. The file is replaced atomically.
+        """
+        chunks = {name: getattr(self, name) for name in INDEX_ARRAYS}
+        blobs = {}
+        for name in STRING_TABLES:
+            offsets, blob = encode_strings(getattr(self, name))
+            chunks[name + "_offsets"] = offsets
+            blobs[name] = blob
+
+        header = {"sources": sources, "sections": {}, "blobs": {}}
+        layout = [(name, "sections", bytes(chunk))
+                  for name, chunk in chunks.items()]
+        layout += [(name, "blobs", blob) for name, blob in blobs.items()]
+
+        # Lay sections out after a fixed-size header region, which is sized
+        # generously and checked once the offsets are known
+        position = header_size = 4096 + 64 * len(layout)
+        for name, kind, data in layout:
+            header[kind][name] = (position, len(data))
+            position = align(position + len(data))
+        encoded = json.dumps(header).encode("utf-8")
+        if len(CACHE_MAGIC) + 4 + len(encoded) > header_size:
+            raise ValueError("snapshot header too large")
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(CACHE_MAGIC)
+            f.write(struct.pack("<I", len(encoded)))
+            f.write(encoded)
+            for name, kind, data in layout:
+                f.seek(header[kind][name][0])
+                f.write(data)
+            f.truncate(align(position))
+        os.replace(tmp, path)
+
+    def num_people(self):
+        return len(self.person_offsets) - 1
+
+    def num_movies(self):
+        return len(self.movie_offsets) - 1
+
+    def person(self, person_id):
+        """
+        Returns the name and birth of a person, like an entry of `people`.
+        """
+        p = self.person_index[person_id]
+        return {"name": self.person_names[p], "birth": self.person_births[p]}
+
+    def movie(self, movie_id):
+        """
+        Returns the title and year of a movie, like an entry of `movies`.
+        """
+        m = self.movie_index[movie_id]
+        return {"title": self.movie_titles[m], "year": self.movie_years[m]}
+
+    def ids_for_name(self, name):
+        """
+        Returns the person_ids of everyone with the given (case-insensitive) name.
+        """
+        return [self.person_ids[p] for p in self.name_index.all(name)]
+
+    def search_names(self, text, limit=10):
+        """
+        Returns up to `limit` person_ids ranked by how well their name matches
+        `text`: exact, then prefix, then typo-tolerant matches.
+        """
+        return [self.person_ids[p] for p in self.name_search.search(text, limit)]
+
+    def movies_of(self, p):
+        """
+        Returns the movie indices of person index `p`.
+        """
+        return self.person_movies[self.person_offsets[p]:self.person_offsets[p + 1]]
+
+    def stars_of(self, m):
+        """
+        Returns the person indices of movie index `m`.
+        """
+        return self.movie_stars[self.movie_offsets[m]:self.movie_offsets[m + 1]]
+
+    def neighbors(self, p):
+        """
+        Yields (movie, person) index pairs for people who starred with `p`.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        for i in range(person_offsets[p], person_offsets[p + 1]):
+            m = person_movies[i]
+            for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                yield m, movie_stars[j]
+
+    def shortest_path(self, source, target, costars=None):
+        """
+        Returns the shortest list of (movie, person) index pairs connecting
+        person index `source` to `target`, or None if they are not connected.
+        `costars` is passed on to bfs_tree.
+        """
+        if source == target:
+            return self.loop_path(source)
+        parent_person, parent_movie = self.bfs_tree(source, {target}, costars)
+        if parent_person[target] == -1:
+            return None
+        return trace_path(parent_person, parent_movie, source, target)
+
+    def loop_path(self, p):
+        """
+        Returns the path from person index `p` to themselves that the
+        dict-based BFS finds, one step through one of their movies, or None
+        if they have no movies.
+        """
+        movies = self.movies_of(p)
+        if not movies:
+            return None
+        return [(movies[0], p)]
+
+    def bfs_tree(self, source, targets=None, costars=None):
+        """
+        Breadth-first search over the CSR arrays from person index `source`.
+        Returns (parent_person, parent_movie) arrays, where -1 marks people
+        not reached; the source is its own parent.
+
+        If `targets` is given, stops as soon as all of them are reached.
+        Every movie is expanded at most once, since all of its stars are
+        reached at the same depth.
+
+        If `costars(person)` is given, people are expanded through it
+        instead, as in NeighborCache.costars.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+
+        parent_person = array(INDEX, [-1]) * self.num_people()
+        parent_movie = array(INDEX, [-1]) * self.num_people()
+        movie_seen = bytearray(self.num_movies())
+        parent_person[source] = source
+
+        remaining = None
+        if targets is not None:
+            remaining = set(targets)
+            remaining.discard(source)
+            if not remaining:
+                return parent_person, parent_movie
+
+        layer = [source]
+        while layer:
+            next_layer = []
+            for p in layer:
+                if costars is not None:
+                    movies, people = costars(p)
+                    for m, q in zip(movies, people):
+                        if parent_person[q] != -1:
+                            continue
+                        parent_person[q] = p
+                        parent_movie[q] = m
+                        if remaining is not None and q in remaining:
+                            remaining.discard(q)
+                            if not remaining:
+                                return parent_person, parent_movie
+                        next_layer.append(q)
+                    continue
+                for i in range(person_offsets[p], person_offsets[p + 1]):
+                    m = person_movies[i]
+                    if movie_seen[m]:
+                        continue
+                    movie_seen[m] = 1
+                    for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                        q = movie_stars[j]
+                        if parent_person[q] != -1:
+                            continue
+                        parent_person[q] = p
+                        parent_movie[q] = m
+                        if remaining is not None and q in remaining:
+                            remaining.discard(q)
+                            if not remaining:
+                                return parent_person, parent_movie
+                        next_layer.append(q)
+            layer = next_layer
+        return parent_person, parent_movie
+
+    def bfs_layers(self, source):
+        """
+        Single-source BFS from person index `source`, one whole layer at a
+        time. Returns (distance, paths): the degrees of separation of every
+        person (-1 if unreachable) and the number of distinct shortest paths
+        to them, where paths through different movies count separately.
+
+        Each movie's path count is the sum over the stars one layer closer
+        to the source, so one linear pass counts every path. The CSR arrays
+        hold each (person, movie) edge once, so a repeated stars.csv row
+        does not count twice.
+
+        Counts are exact: they are kept in unsigned 64-bit arrays, and if
+        any count overflows those the pass is redone with lists of Python
+        integers.
+        """
+        try:
+            return self.count_layers(source, array(COUNT, [0]) * self.num_people(),
+                                     array(COUNT, [0]) * self.num_movies())
+        except OverflowError:
+            return self.count_layers(source, [0] * self.num_people(),
+                                     [0] * self.num_movies())
+
+    def count_layers(self, source, paths, movie_paths):
+        """
+        Runs bfs_layers, counting paths into the zeroed sequences `paths`
+        (per person) and `movie_paths` (per movie).
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+
+        distance = array(INDEX, [-1]) * self.num_people()
+        movie_depth = array(INDEX, [-1]) * self.num_movies()
+        distance[source] = 0
+        paths[source] = 1
+
+        layer = [source]
+        depth = 0
+        while layer:
+            depth += 1
+            movie_layer = []
+            for p in layer:
+                for i in range(person_offsets[p], person_offsets[p + 1]):
+                    m = person_movies[i]
+                    if movie_depth[m] == -1:
+                        movie_depth[m] = depth
+                        movie_paths[m] = paths[p]
+                        movie_layer.append(m)
+                    elif movie_depth[m] == depth:
+                        movie_paths[m] += paths[p]
+
+            next_layer = []
+            for m in movie_layer:
+                for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                    q = movie_stars[j]
+                    if distance[q] == -1:
+                        distance[q] = depth
+                        paths[q] = movie_paths[m]
+                        next_layer.append(q)
+                    elif distance[q] == depth:
+                        paths[q] += movie_paths[m]
+            layer = next_layer
+        return distance, paths
+
+
+def read_columns(path, width):
+    """
+    Reads a CSV after its header into `width` column lists.
+    """
+    columns = [[] for _ in range(width)]
+    appends = [column.append for column in columns]
+    with open(path, encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if len(row) != width:
+                continue
+            for append, value in zip(appends, row):
+                append(value)
+    return columns
+
+
+def histogram(distance):
+    """
+    Counts people at each distance of a `bfs_layers` distance array.
+    Returns (list of counts indexed by distance, number unreachable).
+    """
+    counts = []
+    unreachable = 0
+    for d in distance:
+        if d == -1:
+            unreachable += 1
+            continue
+        while len(counts) <= d:
+            counts.append(0)
+        counts[d] += 1
+    return counts, unreachable
+
+
+def load_cached(directory, workers=1):
+    """
+    Loads the graph for `directory` from its snapshot if the snapshot is
+    newer than the CSVs (same sizes and mtimes), otherwise parses the CSVs
+    (on `workers` processes) and writes a fresh snapshot.
+    """
+    path = os.path.join(directory, CACHE_NAME)
+    sources = source_stats(directory)
+    try:
+        with open(path, "rb") as f:
+            header = read_header(f.read(len(CACHE_MAGIC) + 4 + 65536))
+        if header is not None and header["sources"] == sources:
+            return CompactGraph.load(path)
+    except (OSError, ValueError):
+        pass
+
+    graph = CompactGraph.from_csv(directory, workers=workers)
+    try:
+        graph.save(path, sources=sources)
+    except OSError:
+        # A read-only dataset directory just means no cache
+        pass
+    return graph
+
+
+def source_stats(directory):
+    """
+    Returns the size and mtime of each CSV, used to invalidate snapshots.
+    """
+    stats = {}
+    for name in SOURCES:
+        st = os.stat(os.path.join(directory, name))
+        stats[name] = [st.st_size, st.st_mtime_ns]
+    return stats
+
+
+def read_header(data):
+    """
+    Parses the JSON header at the start of a snapshot, or returns None.
+    """
+    start = len(CACHE_MAGIC) + 4
+    if len(data) < start or data[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+        return None
+    (length,) = struct.unpack("<I", data[len(CACHE_MAGIC):start])
+    try:
+        return json.loads(bytes(data[start:start + length]))
+    except ValueError:
+        return None
+
+
+def align(position):
+    return (position + 7) & ~7
+
+
+def encode_strings(strings):
+    """
+    Encodes a sequence of strings as (offsets, blob): string `i` is
+    `blob[offsets[i]:offsets[i + 1]]` in UTF-8.
+    """
+    offsets = array(INDEX, [0])
+    parts = []
+    position = 0
+    for string in strings:
+        encoded = string.encode("utf-8")
+        parts.append(encoded)
+        position += len(encoded)
+        offsets.append(position)
+    return offsets, b"".join(parts)
+
+
+class StringTable():
+    """
+    Read-only sequence of strings stored as UTF-8 in one buffer, decoded
+    on access.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class SortedIndex():
+    """
+    Maps keys of a string table to their indices by binary search over a
+    permutation of the indices sorted by key, so it can live in a snapshot.
+    """
+
+    def __init__(self, table, order, key=None):
+        self.table = table
+        self.order = order
+        self.key = key
+
+    def normalize(self, value):
+        return self.key(value) if self.key is not None else value
+
+    def sort_key(self, i):
+        return self.normalize(self.table[i])
+
+    def all(self, value):
+        """
+        Returns every index whose key equals `value`, in index order.
+        """
+        value = self.normalize(value)
+        position = bisect_left(self.order, value, key=self.sort_key)
+        found = []
+        while (position < len(self.order)
+               and self.sort_key(self.order[position]) == value):
+            found.append(self.order[position])
+            position += 1
+        return found
+
+    def get(self, value, default=None):
+        found = self.all(value)
+        return found[0] if found else default
+
+    def __getitem__(self, value):
+        found = self.all(value)
+        if not found:
+            raise KeyError(value)
+        return found[0]
+
+    def __contains__(self, value):
+        return bool(self.all(value))
+
+
+def sorted_order(table, key=None):
+    """
+    Returns an index array of `table` sorted by (optionally keyed) value.
+    """
+    if key is None:
+        order = sorted(range(len(table)), key=table.__getitem__)
+    else:
+        order = sorted(range(len(table)), key=lambda i: key(table[i]))
+    return array(INDEX, order)
+
+
+def build_csr(count, keys, values, num_values):
+    """
+    Groups `values` by `keys` (both integer arrays) into CSR offset/index
+    arrays with `count` rows, using a counting sort. Values below
+    `num_values` repeated within a row are kept once.
+    """
+    offsets = array(INDEX, [0]) * (count + 1)
+    for k in keys:
+        offsets[k + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+
+    index = array(INDEX, [0]) * len(values)
+    cursor = offsets[:-1]
+    for k, v in zip(keys, values):
+        index[cursor[k]] = v
+        cursor[k] += 1
+
+    # Compact each row in place, skipping values already seen in it
+    last_row = array(INDEX, [-1]) * num_values
+    write = 0
+    start = 0
+    for k in range(count):
+        end = offsets[k + 1]
+        for i in range(start, end):
+            v = index[i]
+            if last_row[v] != k:
+                last_row[v] = k
+                index[write] = v
+                write += 1
+        start = end
+        offsets[k + 1] = write
+    del index[write:]
+    return offsets, index
+
+
+def trace_path(parent_person, parent_movie, source, target):
+    """
+    Follows parent arrays back from `target` to `source`.
+    """
+    path = []
+    p = target
+    while p != source:
+        path.append((parent_movie[p], p))
+        p = parent_person[p]
+    path.reverse()
+    return path
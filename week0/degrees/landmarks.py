@@ -0,0 +1,321 @@
+"""
+Landmark (ALT) distance index over a CompactGraph.
+
+BFS distances from a few high-degree landmark actors give, by the triangle
+inequality, a lower bound on the distance between any two people:
+
+    d(p, t) >= max over landmarks L of |d(L, p) - d(L, t)|
+
+which drives an A* search, and tells instantly when two people lie in
+different components.
+"""
+
+import csv
+import hashlib
+import heapq
+import io
+import json
+import math
+import os
+import struct
+from collections import deque
+
+from graph import source_stats
+
+# Distances are stored as one byte per person, with FAR for people at least
+# that many steps away and UNREACHABLE for people in another component.
+# Capping keeps |d(L, p) - d(L, t)| a valid lower bound.
+FAR = 254
+UNREACHABLE = 255
+
+INDEX_NAME = "degrees.landmarks"
+INDEX_MAGIC = b"LANDMRK\x02"
+
+
+class LandmarkIndex():
+
+    def __init__(self, graph, landmarks, distances):
+        """
+        `landmarks` is a list of person indices and `distances` a bytearray
+        of len(landmarks) * num_people distances, one row per landmark.
+        """
+        self.graph = graph
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, k=16):
+        """
+        Picks the `k` people with the most movies as landmarks and runs a BFS
+        from each.
+        """
+        offsets = graph.person_offsets
+        people = range(graph.num_people())
+        landmarks = sorted(people, key=lambda p: offsets[p] - offsets[p + 1])[:k]
+        distances = bytearray()
+        for landmark in landmarks:
+            distances += bfs_distances(graph, landmark)
+        return cls(graph, landmarks, distances)
+
+    def row(self, i):
+        n = self.graph.num_people()
+        return memoryview(self.distances)[i * n:(i + 1) * n]
+
+    def lower_bound(self, p, t):
+        """
+        Returns a lower bound on the degrees between person indices `p` and
+        `t`, or None if a landmark proves they are not connected.
+        """
+        n = self.graph.num_people()
+        distances = self.distances
+        bound = 0
+        for i in range(len(self.landmarks)):
+            dp = distances[i * n + p]
+            dt = distances[i * n + t]
+            if (dp == UNREACHABLE) != (dt == UNREACHABLE):
+                return None
+            if dp != UNREACHABLE and abs(dp - dt) > bound:
+                bound = abs(dp - dt)
+        return bound
+
+    def shortest_path(self, source, target):
+        """
+        A* search from person index `source` to `target` using landmark lower
+        bounds. Returns (movie, person) index pairs like
+        CompactGraph.shortest_path, or None if they are not connected.
+        """
+        if source == target:
+            return self.graph.loop_path(source)
+        if self.lower_bound(source, target) is None:
+            return None
+
+        graph = self.graph
+        person_offsets = graph.person_offsets
+        person_movies = graph.person_movies
+        movie_offsets = graph.movie_offsets
+        movie_stars = graph.movie_stars
+
+        # Only landmarks that reach the target give useful bounds, and the
+        # target's own distances are fixed for the whole search
+        bounds = [(self.row(i), self.distances[i * graph.num_people() + target])
+                  for i in range(len(self.landmarks))]
+        bounds = [(row, dt) for row, dt in bounds if dt != UNREACHABLE]
+
+        # Best known depth of each person and of each movie's expansion;
+        # the bounds are consistent, so people are settled once popped
+        cost = {source: 0}
+        parents = {source: None}
+        movie_cost = {}
+        closed = set()
+
+        # Ties on f are broken towards deeper nodes, which are closer to
+        # the target
+        frontier = [(self.lower_bound(source, target), 0, source)]
+
+        while frontier:
+            _, negative_g, p = heapq.heappop(frontier)
+            if p in closed:
+                continue
+            if p == target:
+                path = []
+                while parents[p] is not None:
+                    m, parent = parents[p]
+                    path.append((m, p))
+                    p = parent
+                path.reverse()
+                return path
+            closed.add(p)
+
+            g = -negative_g
+            for i in range(person_offsets[p], person_offsets[p + 1]):
+                m = person_movies[i]
+                if movie_cost.get(m, math.inf) <= g:
+                    continue
+                movie_cost[m] = g
+                for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                    q = movie_stars[j]
+                    if q in closed or cost.get(q, math.inf) <= g + 1:
+                        continue
+                    h = 0
+                    for row, dt in bounds:
+                        d = row[q] - dt
+                        if d < 0:
+                            d = -d
+                        if d > h:
+                            h = d
+                    cost[q] = g + 1
+                    parents[q] = (m, p)
+                    heapq.heappush(frontier, (g + 1 + h, -(g + 1), q))
+        return None
+
+    def save(self, path, directory):
+        """
+        Writes the index with the stats and digest of the CSVs it was
+        built from, so it can later be updated or invalidated.
+        """
+        header = {
+            "landmarks": [self.graph.person_ids[p] for p in self.landmarks],
+            "sources": source_stats(directory),
+            "stars_digest": file_digest(os.path.join(directory, "stars.csv")),
+        }
+        encoded = json.dumps(header).encode("utf-8")
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(INDEX_MAGIC)
+            f.write(struct.pack("<I", len(encoded)))
+            f.write(encoded)
+            f.write(self.distances)
+        os.replace(tmp, path)
+
+    def update(self, appended_rows):
+        """
+        Brings distances up to date after (person_id, movie_id) rows were
+        appended to stars.csv and the graph was reloaded. New edges can only
+        shorten distances, so each landmark's distances are relaxed outward
+        from the people those rows touch rather than recomputed.
+        """
+        graph = self.graph
+        touched = set()
+        for pid, mid in appended_rows:
+            p = graph.person_index.get(pid)
+            m = graph.movie_index.get(mid)
+            if p is None or m is None:
+                continue
+            touched.add(p)
+            touched.update(graph.stars_of(m))
+
+        for i in range(len(self.landmarks)):
+            row = self.row(i)
+            queue = deque()
+            for p in touched:
+                best = row[p]
+                for _, q in graph.neighbors(p):
+                    if row[q] != UNREACHABLE and min(row[q] + 1, FAR) < best:
+                        best = min(row[q] + 1, FAR)
+                if best < row[p]:
+                    row[p] = best
+                    queue.append(p)
+            while queue:
+                p = queue.popleft()
+                d = min(row[p] + 1, FAR)
+                for _, q in graph.neighbors(p):
+                    if d < row[q]:
+                        row[q] = d
+                        queue.append(q)
+
+
+def bfs_distances(graph, source):
+    """
+    Returns a bytearray of BFS distances from person index `source`,
+    capped at FAR.
+    """
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
+
+    distances = bytearray([UNREACHABLE]) * graph.num_people()
+    movie_seen = bytearray(graph.num_movies())
+    distances[source] = 0
+    layer = [source]
+    depth = 0
+    while layer:
+        depth += 1
+        next_layer = []
+        for p in layer:
+            for i in range(person_offsets[p], person_offsets[p + 1]):
+                m = person_movies[i]
+                if movie_seen[m]:
+                    continue
+                movie_seen[m] = 1
+                for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                    q = movie_stars[j]
+                    if distances[q] == UNREACHABLE:
+                        distances[q] = min(depth, FAR)
+                        next_layer.append(q)
+        layer = next_layer
+    return distances
+
+
+def load_index(graph, directory, k=16):
+    """
+    Returns the landmark index for `directory`, reusing the one saved there
+    when possible. If the only change since it was built is rows appended
+    to stars.csv, it is updated incrementally; otherwise it is rebuilt.
+    """
+    path = os.path.join(directory, INDEX_NAME)
+    stars = os.path.join(directory, "stars.csv")
+    sources = source_stats(directory)
+
+    header, distances = read_index(path)
+    if header is not None and len(header["landmarks"]) == k:
+        landmarks = [graph.person_index.get(pid) for pid in header["landmarks"]]
+        old = header["sources"]
+        unchanged = all(old[name] == sources[name]
+                        for name in ("people.csv", "movies.csv"))
+        if (None not in landmarks and unchanged
+                and len(distances) == k * graph.num_people()):
+            index = LandmarkIndex(graph, landmarks, distances)
+            if old["stars.csv"] == sources["stars.csv"]:
+                return index
+
+            old_size = old["stars.csv"][0]
+            if (sources["stars.csv"][0] > old_size
+                    and file_digest(stars, old_size) == header["stars_digest"]):
+                index.update(read_rows_from(stars, old_size))
+                save_quietly(index, path, directory)
+                return index
+
+    index = LandmarkIndex.build(graph, k)
+    save_quietly(index, path, directory)
+    return index
+
+
+def read_index(path):
+    """
+    Returns (header, distances) of a saved index, or (None, None).
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                return None, None
+            (length,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(length))
+            distances = bytearray(f.read())
+    except (OSError, ValueError, struct.error):
+        return None, None
+    return header, distances
+
+
+def save_quietly(index, path, directory):
+    try:
+        index.save(path, directory)
+    except OSError:
+        # A read-only dataset directory just means the index is not kept
+        pass
+
+
+def file_digest(path, size=None):
+    """
+    Returns the SHA-1 of the first `size` bytes of a file (all by default).
+    """
+    digest = hashlib.sha1()
+    remaining = os.path.getsize(path) if size is None else size
+    with open(path, "rb") as f:
+        while remaining > 0:
+            block = f.read(min(remaining, 1 << 20))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def read_rows_from(path, offset):
+    """
+    Returns the (person_id, movie_id) rows of a CSV starting at byte `offset`.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read().decode("utf-8")
+    return [tuple(row) for row in csv.reader(io.StringIO(data)) if len(row) == 2]
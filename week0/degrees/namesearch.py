@@ -0,0 +1,157 @@
+"""
+Prefix and typo-tolerant lookup of people by name.
+
+Prefix matches come from binary search over people sorted by lower-cased
+name. Fuzzy matches come from a trigram index: every distinct lower-cased
+name is split into the trigrams of "  name ", and each trigram maps to the
+ranks (positions in the sorted order) of the names containing it. The
+trigram table is stored as CSR arrays so it can live in the snapshot.
+"""
+
+from array import array
+from bisect import bisect_left
+
+INDEX = "i"
+
+# Most postings read for one fuzzy query; the rarest trigrams of the query
+# are read first, since they are the most selective
+POSTINGS_BUDGET = 5000
+
+# Candidates re-scored exactly after counting shared trigrams
+SHORTLIST = 50
+
+# Least trigram (Jaccard) similarity for a fuzzy match
+MIN_SCORE = 0.3
+
+
+def trigrams(name):
+    padded = f"  {name.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameSearch():
+
+    def __init__(self, names, order, keys, offsets, postings):
+        """
+        `names` is the table of person names and `order` the person indices
+        sorted by lower-cased name. `keys` are the sorted trigrams, and the
+        postings of `keys[i]` are `postings[offsets[i]:offsets[i + 1]]`.
+        """
+        self.names = names
+        self.order = order
+        self.keys = keys
+        self.offsets = offsets
+        self.postings = postings
+
+    @classmethod
+    def build(cls, names, order):
+        """
+        Indexes the trigrams of each distinct name in `order`.
+        """
+        index = {}
+        previous = None
+        for rank, p in enumerate(order):
+            name = names[p].lower()
+            if name == previous:
+                continue
+            previous = name
+            for trigram in trigrams(name):
+                index.setdefault(trigram, []).append(rank)
+
+        keys = sorted(index)
+        offsets = array(INDEX, [0])
+        postings = array(INDEX)
+        for key in keys:
+            postings.extend(index[key])
+            offsets.append(len(postings))
+        return cls(names, order, keys, offsets, postings)
+
+    def lower_name(self, rank):
+        return self.names[self.order[rank]].lower()
+
+    def same_name(self, rank):
+        """
+        Returns every person index sharing the name at `rank`.
+        """
+        name = self.lower_name(rank)
+        found = []
+        while rank < len(self.order) and self.lower_name(rank) == name:
+            found.append(self.order[rank])
+            rank += 1
+        return found
+
+    def prefix(self, text, limit=10):
+        """
+        Returns up to `limit` person indices whose name starts with `text`,
+        in name order.
+        """
+        text = text.lower()
+        rank = bisect_left(self.order, text, key=lambda p: self.names[p].lower())
+        found = []
+        while (rank < len(self.order) and len(found) < limit
+               and self.lower_name(rank).startswith(text)):
+            found.append(self.order[rank])
+            rank += 1
+        return found
+
+    def fuzzy(self, text, limit=10):
+        """
+        Returns up to `limit` (score, person index) pairs ranked by trigram
+        similarity to `text`, best first.
+        """
+        wanted = trigrams(text)
+        ranges = []
+        for trigram in wanted:
+            i = bisect_left(self.keys, trigram)
+            if i < len(self.keys) and self.keys[i] == trigram:
+                ranges.append((self.offsets[i], self.offsets[i + 1]))
+        ranges.sort(key=lambda r: r[1] - r[0])
+
+        shared = {}
+        budget = POSTINGS_BUDGET
+        for start, end in ranges:
+            if end - start > budget and shared:
+                break
+            for rank in self.postings[start:end]:
+                shared[rank] = shared.get(rank, 0) + 1
+            budget -= end - start
+
+        shortlist = sorted(shared, key=shared.get, reverse=True)[:SHORTLIST]
+        scored = []
+        for rank in shortlist:
+            name = self.lower_name(rank)
+            have = trigrams(name)
+            score = len(wanted & have) / len(wanted | have)
+            if score < MIN_SCORE:
+                continue
+            scored.append((-score, abs(len(name) - len(text)), rank))
+        scored.sort()
+
+        found = []
+        for negative_score, _, rank in scored:
+            for p in self.same_name(rank):
+                found.append((-negative_score, p))
+                if len(found) == limit:
+                    return found
+        return found
+
+    def search(self, text, limit=10):
+        """
+        Returns up to `limit` ranked person indices for `text`: exact
+        matches first, then prefix matches, then fuzzy matches.
+        """
+        found = []
+        seen = set()
+
+        def take(candidates):
+            for p in candidates:
+                if p not in seen and len(found) < limit:
+                    seen.add(p)
+                    found.append(p)
+
+        prefixed = self.prefix(text, limit)
+        take(p for p in prefixed if self.names[p].lower() == text.lower())
+        take(prefixed)
+        if len(found) < limit:
+            take(p for _, p in self.fuzzy(text, limit))
+        return found
@@ -0,0 +1,50 @@
+import io
+import os
+import time
+
+import degrees
+
+SMALL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "small")
+
+
+def test_read_chunks_by_size():
+    stream = io.StringIO("".join(f"{i}\n" for i in range(7)))
+    chunks = list(degrees.read_chunks(stream, 3, 60))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert chunks[2] == [(7, "6\n")]
+
+
+def test_read_chunks_by_time():
+    # A chunk is yielded while the stream is still open
+    read_end, write_end = os.pipe()
+    with os.fdopen(read_end, encoding="utf-8") as stream, \
+            os.fdopen(write_end, "w", encoding="utf-8") as writer:
+        writer.write("a\nb\n")
+        writer.flush()
+        start = time.monotonic()
+        chunk = next(degrees.read_chunks(stream, 100, 0.05))
+        assert chunk == [(1, "a\n"), (2, "b\n")]
+        assert time.monotonic() - start < 5
+
+
+def path_lengths(person_ids, bidirectional):
+    return [
+        None if path is None else len(path)
+        for path in (degrees.shortest_path(s, t, bidirectional=bidirectional)
+                     for s in person_ids for t in person_ids)
+    ]
+
+
+def test_searches_through_neighbor_cache():
+    degrees.neighbor_cache = None
+    degrees.load_data(SMALL, compact=True, cache=False)
+    person_ids = list(degrees.graph.person_ids)
+    expected = path_lengths(person_ids, False)
+    degrees.enable_neighbor_cache(max_entries=4)
+    try:
+        for bidirectional in (False, True):
+            assert path_lengths(person_ids, bidirectional) == expected
+        assert degrees.neighbor_cache.stats()["hits"] > 0
+    finally:
+        degrees.neighbor_cache = None
+        degrees.graph = None
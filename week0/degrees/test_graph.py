@@ -0,0 +1,102 @@
+import os
+import shutil
+from array import array
+
+import degrees
+from graph import INDEX, CompactGraph
+
+SMALL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "small")
+
+
+def load_dicts(directory):
+    """Returns a CompactGraph built from the dict loader's people and movies."""
+    for table in (degrees.names, degrees.people, degrees.movies):
+        table.clear()
+    degrees.load_data(directory)
+    return CompactGraph.from_dicts(degrees.people, degrees.movies)
+
+
+def repeated_rows(tmp_path, count):
+    """Copies the small dataset into tmp_path with the first `count` stars
+    rows repeated."""
+    for name in ("people.csv", "movies.csv", "stars.csv"):
+        shutil.copy(os.path.join(SMALL, name), tmp_path / name)
+    with open(tmp_path / "stars.csv", encoding="utf-8") as f:
+        rows = f.read().splitlines()[1:count + 1]
+    with open(tmp_path / "stars.csv", "a", encoding="utf-8") as f:
+        f.write("\n".join(rows) + "\n")
+    return str(tmp_path)
+
+
+def test_repeated_stars_row(tmp_path):
+    directory = repeated_rows(tmp_path, 1)
+    compact = CompactGraph.from_csv(directory)
+    expected = load_dicts(directory)
+    assert compact.person_ids == expected.person_ids
+    assert list(compact.person_offsets) == list(expected.person_offsets)
+    assert list(compact.movie_offsets) == list(expected.movie_offsets)
+
+
+def test_path_counts_with_repeated_rows(tmp_path):
+    directory = repeated_rows(tmp_path, 5)
+    compact = CompactGraph.from_csv(directory)
+    expected = load_dicts(directory)
+    for source in range(compact.num_people()):
+        distance, paths = compact.bfs_layers(source)
+        expected_distance, expected_paths = expected.bfs_layers(source)
+        assert list(distance) == list(expected_distance)
+        assert list(paths) == list(expected_paths)
+
+
+def test_path_to_self():
+    graph = CompactGraph.from_csv(SMALL)
+    for p in range(graph.num_people()):
+        movies = graph.movies_of(p)
+        expected = [(movies[0], p)] if movies else None
+        assert graph.shortest_path(p, p) == expected
+
+
+def test_malformed_rows(tmp_path):
+    directory = repeated_rows(tmp_path, 0)
+    for name in ("people.csv", "movies.csv", "stars.csv"):
+        with open(tmp_path / name, "a", encoding="utf-8") as f:
+            f.write("\n1,2,3,4\n")
+    expected = CompactGraph.from_csv(SMALL)
+    for graph in (CompactGraph.from_csv(directory), load_dicts(directory)):
+        assert graph.person_ids == expected.person_ids
+        assert list(graph.person_offsets) == list(expected.person_offsets)
+
+
+def layered(layers, width):
+    """
+    Returns a graph where person 0 and each layer of `width` people share a
+    movie with the next layer, so there are width**(d - 1) shortest paths
+    to each person at distance d.
+    """
+    edge_people = array(INDEX)
+    edge_movies = array(INDEX)
+    previous = [0]
+    count = 1
+    for m in range(layers):
+        layer = list(range(count, count + width))
+        count += width
+        for p in previous + layer:
+            edge_people.append(p)
+            edge_movies.append(m)
+        previous = layer
+    return CompactGraph.from_edges(
+        [str(p) for p in range(count)], [f"P{p}" for p in range(count)],
+        [""] * count, [str(m) for m in range(layers)],
+        [f"M{m}" for m in range(layers)], [""] * layers,
+        edge_people, edge_movies
+    )
+
+
+def test_exact_path_counts():
+    # 3**40 fits in 64 bits and 3**45 does not
+    for layers in (41, 46):
+        graph = layered(layers, 3)
+        distance, paths = graph.bfs_layers(0)
+        for p in range(1, graph.num_people()):
+            assert distance[p] == (p - 1) // 3 + 1
+            assert paths[p] == 3 ** (distance[p] - 1)
@@ -0,0 +1,59 @@
+from array import array
+
+from graph import CompactGraph, INDEX
+from landmarks import FAR, UNREACHABLE, LandmarkIndex, bfs_distances
+
+
+def chain(length, islands=0):
+    """
+    Returns a graph of `length` people where each consecutive pair shares a
+    movie, plus `islands` people with a movie of their own.
+    """
+    count = length + islands
+    edge_people = array(INDEX)
+    edge_movies = array(INDEX)
+    for m in range(length - 1):
+        edge_people.extend([m, m + 1])
+        edge_movies.extend([m, m])
+    for i in range(islands):
+        edge_people.append(length + i)
+        edge_movies.append(length - 1 + i)
+    movies = length - 1 + islands
+    return CompactGraph.from_edges(
+        [str(p) for p in range(count)], [f"P{p}" for p in range(count)],
+        [""] * count, [str(m) for m in range(movies)],
+        [f"M{m}" for m in range(movies)], [""] * movies,
+        edge_people, edge_movies
+    )
+
+
+def test_far_people_stay_reachable():
+    graph = chain(300, islands=1)
+    distances = bfs_distances(graph, 0)
+    assert distances[100] == 100
+    assert distances[299] == FAR
+    assert distances[300] == UNREACHABLE
+
+
+def test_paths_beyond_the_cap():
+    graph = chain(300, islands=1)
+    index = LandmarkIndex(graph, [0], bfs_distances(graph, 0))
+    assert index.lower_bound(260, 299) == 0
+    assert index.lower_bound(10, 299) == FAR - 10
+    assert index.lower_bound(299, 300) is None
+    assert len(index.shortest_path(0, 299)) == 299
+    assert len(index.shortest_path(260, 299)) == 39
+    assert index.shortest_path(299, 300) is None
+
+
+def test_update_beyond_the_cap():
+    # Person 299 starts with a movie of their own, then a stars row adds
+    # person 298 to it
+    before = chain(299, islands=1)
+    after = chain(300)
+    index = LandmarkIndex(before, [0], bfs_distances(before, 0))
+    assert index.distances[299] == UNREACHABLE
+    index.graph = after
+    index.update([("298", "298")])
+    assert index.distances == bfs_distances(after, 0)
+    assert index.distances[299] == FAR
@@ -1,3 +1,8 @@
+import sys
+from array import array
+from collections import OrderedDict, deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -7,13 +12,17 @@ class Node():
 
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+        # Counts of each state currently in the frontier, so that
+        # contains_state does not need to scan
+        self.states = {}
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
@@ -22,10 +31,17 @@ class StackFrontier():
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
+            node = self.frontier.pop()
+            self.discard(node.state)
             return node
 
+    def discard(self, state):
+        count = self.states[state]
+        if count == 1:
+            del self.states[state]
+        else:
+            self.states[state] = count - 1
+
 
 class QueueFrontier(StackFrontier):
 
@@ -33,6 +49,87 @@ class QueueFrontier(StackFrontier):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
+            node = self.frontier.popleft()
+            self.discard(node.state)
             return node
+
+
+class NeighborCache():
+    """
+    Bounded LRU memo of deduplicated co-stars.
+
+    `expand(person)` yields (movie, person) pairs; for each person it is
+    called once per cache miss and reduced to one linking movie per
+    distinct co-star. Entries are evicted least recently used first once
+    `max_entries` entries or `max_bytes` bytes are exceeded.
+    """
+
+    def __init__(self, expand, max_entries=None, max_bytes=None, typecode=None):
+        self.expand = expand
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Integer people and movies are stored as compact arrays
+        self.typecode = typecode
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def costars(self, person):
+        """
+        Returns (movies, people): parallel sequences of each distinct co-star
+        and one movie they share with `person`.
+        """
+        entry = self.entries.get(person)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(person)
+            return entry
+
+        self.misses += 1
+        linked = {}
+        for movie, costar in self.expand(person):
+            if costar != person and costar not in linked:
+                linked[costar] = movie
+        if self.typecode is not None:
+            entry = (array(self.typecode, linked.values()),
+                     array(self.typecode, linked.keys()))
+        else:
+            entry = (tuple(linked.values()), tuple(linked.keys()))
+
+        self.entries[person] = entry
+        self.bytes += entry_size(entry)
+        self.evict()
+        return entry
+
+    def pairs(self, person):
+        """
+        Returns (movie, person) pairs like `expand`, one per distinct co-star.
+        """
+        movies, people = self.costars(person)
+        return zip(movies, people)
+
+    def evict(self):
+        while self.entries and (
+            (self.max_entries is not None and len(self.entries) > self.max_entries)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            _, entry = self.entries.popitem(last=False)
+            self.bytes -= entry_size(entry)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def entry_size(entry):
+    return sum(sys.getsizeof(part) for part in entry)
@@ -0,0 +1,224 @@
+"""
+Bitboard Tic Tac Toe
+
+A board is a pair of 9-bit masks (x, o); cell (i, j) is bit 3 * i + j.
+Wins, player and terminal checks are table lookups on the masks.
+"""
+
+import math
+
+X = "X"
+O = "O"
+
+FULL = 0b111111111
+
+WIN_MASKS = [
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100,               # diagonals
+]
+
+# WINNING[mask] is 1 if the cells in mask contain a line
+WINNING = bytes(
+    any(mask & line == line for line in WIN_MASKS) for mask in range(1 << 9)
+)
+
+# Bits tried first by the search: centre, then corners, then edges
+MOVE_ORDER = [4, 0, 2, 6, 8, 1, 3, 5, 7]
+
+EMPTY_BOARD = (0, 0)
+
+
+def symmetry_table(f):
+    """
+    Returns a 512-entry table mapping each mask to its image under the cell
+    transformation `f(i, j) -> (i, j)`.
+    """
+    table = []
+    for mask in range(1 << 9):
+        image = 0
+        for bit in range(9):
+            if mask >> bit & 1:
+                i, j = f(*divmod(bit, 3))
+                image |= 1 << (3 * i + j)
+        table.append(image)
+    return table
+
+
+# The 8 rotations and reflections of the board as mask tables
+SYMMETRIES = [symmetry_table(f) for f in (
+    lambda i, j: (i, j),
+    lambda i, j: (j, 2 - i),
+    lambda i, j: (2 - i, 2 - j),
+    lambda i, j: (2 - j, i),
+    lambda i, j: (i, 2 - j),
+    lambda i, j: (2 - i, j),
+    lambda i, j: (j, i),
+    lambda i, j: (2 - j, 2 - i),
+)]
+
+# Transposition table flags: the stored value is exact, or only a
+# lower/upper bound because the search was cut off
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Maps canonical board keys to (value, flag)
+transpositions = {}
+
+# Number of positions visited by alphabeta, for benchmarks
+nodes = 0
+
+
+def from_lists(board):
+    """
+    Converts a list-of-lists board of "X"/"O"/None to a bitboard.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                x |= 1 << (3 * i + j)
+            elif cell == O:
+                o |= 1 << (3 * i + j)
+    return (x, o)
+
+
+def to_lists(bitboard):
+    """
+    Converts a bitboard back to a list-of-lists board.
+    """
+    x, o = bitboard
+    return [[X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1 else None
+             for j in range(3)]
+            for i in range(3)]
+
+
+def player(bitboard):
+    x, o = bitboard
+    return X if x.bit_count() <= o.bit_count() else O
+
+
+def actions(bitboard):
+    """
+    Returns the set of available (i, j) actions.
+    """
+    x, o = bitboard
+    empty = FULL & ~(x | o)
+    return {divmod(bit, 3) for bit in range(9) if empty >> bit & 1}
+
+
+def result(bitboard, action):
+    i, j = action
+    bit = 1 << (3 * i + j)
+    x, o = bitboard
+    if not (0 <= i < 3 and 0 <= j < 3) or (x | o) & bit:
+        raise ValueError(f"invalid action {action}")
+    if x.bit_count() <= o.bit_count():
+        return (x | bit, o)
+    return (x, o | bit)
+
+
+def winner(bitboard):
+    x, o = bitboard
+    if WINNING[x]:
+        return X
+    if WINNING[o]:
+        return O
+    return None
+
+
+def terminal(bitboard):
+    x, o = bitboard
+    return bool(WINNING[x] or WINNING[o]) or (x | o) == FULL
+
+
+def utility(bitboard):
+    x, o = bitboard
+    if WINNING[x]:
+        return 1
+    if WINNING[o]:
+        return -1
+    return 0
+
+
+def canonical(x, o):
+    """
+    Returns the same integer for a position and all of its rotations and
+    reflections.
+    """
+    return min(table[x] | table[o] << 9 for table in SYMMETRIES)
+
+
+def best_move(bitboard):
+    """
+    Returns the optimal (i, j) action for the player to move, or None if
+    the game is over.
+    """
+    x, o = bitboard
+    if terminal(bitboard):
+        return None
+    maximizing = x.bit_count() <= o.bit_count()
+    alpha, beta = -math.inf, math.inf
+    best = None
+    for bit in MOVE_ORDER:
+        if (x | o) >> bit & 1:
+            continue
+        if maximizing:
+            value = alphabeta(x | 1 << bit, o, False, alpha, beta)
+            if value > alpha:
+                alpha, best = value, bit
+        else:
+            value = alphabeta(x, o | 1 << bit, True, alpha, beta)
+            if value < beta:
+                beta, best = value, bit
+    return divmod(best, 3)
+
+
+def alphabeta(x, o, maximizing, alpha, beta):
+    """
+    Returns the score of a position, exact if it lies strictly between
+    alpha and beta and otherwise a bound beyond them. Scores are scaled by
+    the number of empty cells so that quicker wins are preferred.
+    """
+    global nodes
+    nodes += 1
+    key = canonical(x, o)
+    entry = transpositions.get(key)
+    if entry is not None:
+        value, flag = entry
+        if flag == EXACT:
+            return value
+        if flag == LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return value
+
+    occupied = x | o
+    if WINNING[x] or WINNING[o] or occupied == FULL:
+        value = (WINNING[x] - WINNING[o]) * (9 - occupied.bit_count() + 1)
+        transpositions[key] = (value, EXACT)
+        return value
+
+    original_alpha, original_beta = alpha, beta
+    best = -math.inf if maximizing else math.inf
+    for bit in MOVE_ORDER:
+        if occupied >> bit & 1:
+            continue
+        if maximizing:
+            best = max(best, alphabeta(x | 1 << bit, o, False, alpha, beta))
+            alpha = max(alpha, best)
+        else:
+            best = min(best, alphabeta(x, o | 1 << bit, True, alpha, beta))
+            beta = min(beta, best)
+        if alpha >= beta:
+            break
+
+    if best <= original_alpha:
+        flag = UPPER
+    elif best >= original_beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    transpositions[key] = (best, flag)
+    return best
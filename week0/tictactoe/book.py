@@ -0,0 +1,209 @@
+"""
+Perfect-play table for 3x3 Tic Tac Toe.
+
+Every position reachable from the initial state is solved once and stored
+as one byte at its base-3 index (cell bit i is digit i: 0 empty, 1 X,
+2 O). The low four bits hold the best move's bit (NO_MOVE when the game is
+over) and the next two bits the game value plus one. Unreachable indices
+hold UNREACHABLE.
+
+    python book.py build    write book.bin
+    python book.py verify   check the table against the live search
+    python book.py bench    time loading the table
+"""
+
+import os
+import sys
+import time
+
+import bitboard
+
+SIZE = 3 ** 9
+NO_MOVE = 0x0F
+UNREACHABLE = 0xFF
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# Loaded table, see `table`
+loaded = None
+
+# Base-3 digit weight of each cell bit
+POWERS = [3 ** bit for bit in range(9)]
+
+
+def index(x, o):
+    """
+    Returns the base-3 index of a bitboard position.
+    """
+    value = 0
+    for bit in range(9):
+        if x >> bit & 1:
+            value += POWERS[bit]
+        elif o >> bit & 1:
+            value += 2 * POWERS[bit]
+    return value
+
+
+def build():
+    """
+    Solves every reachable position and returns the table as bytes.
+    """
+    entries = bytearray([UNREACHABLE]) * SIZE
+    scores = {}
+
+    def solve(x, o):
+        """
+        Returns the score of a position (positive favours X, larger for
+        quicker wins), filling in its table entry.
+        """
+        key = (x, o)
+        if key in scores:
+            return scores[key]
+        occupied = x | o
+        if bitboard.terminal((x, o)):
+            score = bitboard.utility((x, o)) * (9 - occupied.bit_count() + 1)
+            move = NO_MOVE
+        else:
+            maximizing = x.bit_count() <= o.bit_count()
+            score, move = None, None
+            for bit in bitboard.MOVE_ORDER:
+                if occupied >> bit & 1:
+                    continue
+                if maximizing:
+                    value = solve(x | 1 << bit, o)
+                    better = score is None or value > score
+                else:
+                    value = solve(x, o | 1 << bit)
+                    better = score is None or value < score
+                if better:
+                    score, move = value, bit
+        scores[key] = score
+        sign = (score > 0) - (score < 0)
+        entries[index(x, o)] = move | (sign + 1) << 4
+        return score
+
+    solve(0, 0)
+    return bytes(entries)
+
+
+def save(entries, path=BOOK_PATH):
+    with open(path, "wb") as f:
+        f.write(entries)
+
+
+def table():
+    """
+    Returns the table, reading book.bin once or building it in memory if
+    the file is missing or damaged.
+    """
+    global loaded
+    if loaded is None:
+        try:
+            with open(BOOK_PATH, "rb") as f:
+                entries = f.read()
+        except OSError:
+            entries = b""
+        loaded = entries if len(entries) == SIZE else build()
+    return loaded
+
+
+def lookup(bitboard_position):
+    """
+    Returns (move, value) for a position: the best (i, j) action (None if
+    the game is over) and the game value for X. Returns None for positions
+    that cannot arise in a legal game.
+    """
+    x, o = bitboard_position
+    entry = table()[index(x, o)]
+    if entry == UNREACHABLE:
+        return None
+    move = entry & 0x0F
+    value = (entry >> 4) - 1
+    return (None if move == NO_MOVE else divmod(move, 3)), value
+
+
+def best_move(bitboard_position):
+    """
+    Returns the optimal action from the table, falling back to a live
+    search for positions not in it.
+    """
+    found = lookup(bitboard_position)
+    if found is None:
+        return bitboard.best_move(bitboard_position)
+    return found[0]
+
+
+def verify():
+    """
+    Checks every table entry against the live alpha-beta search. Returns
+    the number of mismatches.
+    """
+    entries = table()
+    mismatches = 0
+    checked = 0
+    for i, entry in enumerate(entries):
+        if entry == UNREACHABLE:
+            continue
+        x = o = 0
+        value = i
+        for bit in range(9):
+            value, digit = divmod(value, 3)
+            if digit == 1:
+                x |= 1 << bit
+            elif digit == 2:
+                o |= 1 << bit
+        checked += 1
+        move, stored = lookup((x, o))
+        if bitboard.terminal((x, o)):
+            ok = move is None and stored == bitboard.utility((x, o))
+        else:
+            maximizing = x.bit_count() <= o.bit_count()
+            live = bitboard.alphabeta(x, o, maximizing, -100, 100)
+            after = bitboard.result((x, o), move)
+            reply = bitboard.alphabeta(after[0], after[1], not maximizing, -100, 100)
+            sign = (live > 0) - (live < 0)
+            ok = sign == stored and ((reply > 0) - (reply < 0)) == sign
+        if not ok:
+            mismatches += 1
+    print(f"Checked {checked} positions, {mismatches} mismatches.")
+    return mismatches
+
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] not in ("build", "verify", "bench"):
+        sys.exit("Usage: python book.py build|verify|bench")
+    command = sys.argv[1]
+
+    if command == "build":
+        start = time.perf_counter()
+        entries = build()
+        elapsed = time.perf_counter() - start
+        save(entries)
+        reachable = sum(entry != UNREACHABLE for entry in entries)
+        print(f"Solved {reachable} positions in {elapsed:.3f}s, wrote {BOOK_PATH}")
+
+    elif command == "verify":
+        if verify():
+            sys.exit(1)
+
+    else:
+        global loaded
+        for label in ("file", "build"):
+            loaded = None
+            if label == "build":
+                start = time.perf_counter()
+                loaded = build()
+            else:
+                start = time.perf_counter()
+                table()
+            elapsed = time.perf_counter() - start
+            print(f"{label:>6}: {1000 * elapsed:.2f}ms")
+        start = time.perf_counter()
+        for _ in range(10000):
+            best_move((0, 0))
+        per_lookup = (time.perf_counter() - start) / 10000
+        print(f"lookup: {1e6 * per_lookup:.2f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Search engine for N x N Tic Tac Toe with k in a row to win.
+
+Boards are bitboards over size * size bits, one int per player; cell
+(i, j) is bit size * i + j. The search is iterative-deepening negamax with
+alpha-beta pruning, a transposition table that also supplies the first
+move to try, and a heuristic evaluation at the depth limit. Only lines
+through the last move are checked for a win.
+"""
+
+import time
+
+X = "X"
+O = "O"
+
+# Score of a won position; wins found sooner score higher
+WIN = 1_000_000
+
+# Transposition table flags
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Nodes searched between checks of the clock
+CLOCK_INTERVAL = 1024
+
+# Boards at least this wide only consider cells next to a stone
+NEIGHBORHOOD_MIN_SIZE = 5
+
+
+class Timeout(Exception):
+    """
+    Raised inside the search when time runs out or it is cancelled.
+    """
+
+
+class Geometry():
+    """
+    Precomputed masks for a board size and win length.
+    """
+
+    def __init__(self, size, k):
+        if not 1 <= k <= size:
+            raise ValueError("win length must be between 1 and the board size")
+        self.size = size
+        self.k = k
+        self.cells = size * size
+        self.full = (1 << self.cells) - 1
+
+        # Every window of k cells in a row, column or diagonal
+        self.lines = []
+        for i in range(size):
+            for j in range(size):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                    if 0 <= end_i < size and 0 <= end_j < size:
+                        mask = 0
+                        for step in range(k):
+                            mask |= 1 << (size * (i + di * step) + j + dj * step)
+                        self.lines.append(mask)
+
+        # The windows through each cell, for win checks around a move
+        self.lines_through = [[line for line in self.lines if line >> cell & 1]
+                              for cell in range(self.cells)]
+
+        # Cells within one step of each cell, for candidate moves
+        self.near = []
+        for cell in range(self.cells):
+            i, j = divmod(cell, size)
+            mask = 0
+            for ni in range(max(0, i - 1), min(size, i + 2)):
+                for nj in range(max(0, j - 1), min(size, j + 2)):
+                    mask |= 1 << (size * ni + nj)
+            self.near.append(mask)
+
+        # Cells through more windows are tried first
+        self.order = sorted(range(self.cells),
+                            key=lambda cell: -len(self.lines_through[cell]))
+
+    def wins_at(self, mask, cell):
+        """
+        Returns whether `mask` has a line through `cell`.
+        """
+        for line in self.lines_through[cell]:
+            if mask & line == line:
+                return True
+        return False
+
+    def wins(self, mask):
+        for line in self.lines:
+            if mask & line == line:
+                return True
+        return False
+
+
+geometries = {}
+
+
+def geometry(size, k):
+    if (size, k) not in geometries:
+        geometries[(size, k)] = Geometry(size, k)
+    return geometries[(size, k)]
+
+
+class Search():
+    """
+    One move's search, bounded by a time budget in seconds. Setting the
+    optional `cancel` event (a threading.Event) stops it like a timeout.
+    """
+
+    def __init__(self, geometry, time_limit=1.0, cancel=None):
+        self.geometry = geometry
+        self.time_limit = time_limit
+        self.cancel = cancel
+        self.transpositions = {}
+        self.nodes = 0
+        self.depth = 0
+        self.deadline = None
+
+    def best_move(self, own, other):
+        """
+        Returns the best cell for the player owning `own` to play, deepening
+        until the time runs out, the result is proven or the board is full.
+        """
+        g = self.geometry
+        empty = g.cells - (own | other).bit_count()
+        if empty == 0:
+            return None
+        self.deadline = time.perf_counter() + self.time_limit
+
+        best = None
+        for depth in range(1, empty + 1):
+            try:
+                value, move = self.root(own, other, depth)
+            except Timeout:
+                break
+            best = move
+            self.depth = depth
+            if abs(value) >= WIN - g.cells:
+                break
+        if best is None:
+            # Not even depth 1 finished; play the most central free cell
+            best = next(cell for cell in self.candidates(own, other))
+        return best
+
+    def root(self, own, other, depth):
+        alpha, beta = -WIN - 1, WIN + 1
+        best_value, best_move = -WIN - 1, None
+        for cell in self.ordered(own, other):
+            bit = 1 << cell
+            if self.geometry.wins_at(own | bit, cell):
+                return WIN - 1, cell
+            value = -self.negamax(other, own | bit, depth - 1, -beta, -alpha, 1)
+            if value > best_value:
+                best_value, best_move = value, cell
+            alpha = max(alpha, value)
+        self.transpositions[(own, other)] = (depth, best_value, EXACT, best_move)
+        return best_value, best_move
+
+    def negamax(self, own, other, depth, alpha, beta, ply):
+        """
+        Scores the position for the player owning `own`, who is to move.
+        The opponent's last move did not win (checked by the caller).
+        """
+        self.nodes += 1
+        if self.nodes % CLOCK_INTERVAL == 0 and self.out_of_time():
+            raise Timeout()
+
+        g = self.geometry
+        if (own | other) == g.full:
+            return 0
+        if depth == 0:
+            return self.evaluate(own, other)
+
+        original_alpha, original_beta = alpha, beta
+        key = (own, other)
+        entry = self.transpositions.get(key)
+        if entry is not None and entry[0] >= depth:
+            _, value, flag, _ = entry
+            if flag == EXACT:
+                return value
+            if flag == LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        best_value, best_move = -WIN - 1, None
+        for cell in self.ordered(own, other):
+            bit = 1 << cell
+            if g.wins_at(own | bit, cell):
+                value = WIN - ply
+            else:
+                value = -self.negamax(other, own | bit, depth - 1,
+                                      -beta, -alpha, ply + 1)
+            if value > best_value:
+                best_value, best_move = value, cell
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best_value <= original_alpha:
+            flag = UPPER
+        elif best_value >= original_beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.transpositions[key] = (depth, best_value, flag, best_move)
+        return best_value
+
+    def out_of_time(self):
+        if self.cancel is not None and self.cancel.is_set():
+            return True
+        return time.perf_counter() > self.deadline
+
+    def candidates(self, own, other):
+        """
+        Yields free cells, most central first. On large boards only cells
+        next to a stone are considered (any cell on an empty board).
+        """
+        g = self.geometry
+        occupied = own | other
+        if occupied and g.size >= NEIGHBORHOOD_MIN_SIZE:
+            near = 0
+            stones = occupied
+            while stones:
+                low = stones & -stones
+                near |= g.near[low.bit_length() - 1]
+                stones ^= low
+            allowed = near & ~occupied
+        else:
+            allowed = g.full & ~occupied
+        for cell in g.order:
+            if allowed >> cell & 1:
+                yield cell
+
+    def ordered(self, own, other):
+        """
+        Returns candidate cells with the transposition table's best move
+        from a previous iteration first.
+        """
+        cells = list(self.candidates(own, other))
+        entry = self.transpositions.get((own, other))
+        if entry is not None and entry[3] in cells:
+            cells.remove(entry[3])
+            cells.insert(0, entry[3])
+        return cells
+
+    def evaluate(self, own, other):
+        """
+        Heuristic score for the player to move: each window still open to
+        only one player counts 4 ** stones for that player.
+        """
+        score = 0
+        for line in self.geometry.lines:
+            mine = own & line
+            theirs = other & line
+            if mine and not theirs:
+                score += 4 ** mine.bit_count()
+            elif theirs and not mine:
+                score -= 4 ** theirs.bit_count()
+        return score
+
+
+def from_lists(board):
+    """
+    Converts a list-of-lists board to (x, o) bitboards.
+    """
+    size = len(board)
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                x |= 1 << (size * i + j)
+            elif cell == O:
+                o |= 1 << (size * i + j)
+    return x, o
+
+
+def best_move(board, k, time_limit=1.0, cancel=None):
+    """
+    Returns an (i, j) action for the player to move on a list-of-lists
+    board, searching for at most about `time_limit` seconds or until
+    `cancel` is set.
+    """
+    size = len(board)
+    x, o = from_lists(board)
+    search = Search(geometry(size, k), time_limit, cancel)
+    if x.bit_count() <= o.bit_count():
+        cell = search.best_move(x, o)
+    else:
+        cell = search.best_move(o, x)
+    return None if cell is None else divmod(cell, size)
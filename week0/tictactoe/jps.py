@@ -0,0 +1,320 @@
+"""
+Jump Point Search over a maze's wall grid.
+
+JPS is A* over jump points only: from each expanded cell it scans in
+straight lines, skipping cells whose every shortest path can go around
+them, and stops where a wall forces a turn (a forced neighbor) or at the
+goal. Open maps with sparse walls expand far fewer cells than A*.
+
+The 4-connected search moves up, down, left and right; a vertical scan
+also stops wherever a horizontal scan from it would find a jump point.
+The 8-connected search adds diagonal moves (cost sqrt 2), allowed only
+when both orthogonal cells beside the move are open, and a diagonal scan
+stops wherever a horizontal or vertical scan from it would.
+
+    python jps.py bench [--size N] [--density D] [--maps M] [--seed S]
+
+compares JPS with BFS and A* on generated N x N maps.
+"""
+
+import argparse
+import heapq
+import itertools
+import math
+import os
+import random
+import tempfile
+import time
+
+ACTIONS = {
+    (-1, 0): "up",
+    (1, 0): "down",
+    (0, -1): "left",
+    (0, 1): "right",
+    (-1, -1): "up-left",
+    (-1, 1): "up-right",
+    (1, -1): "down-left",
+    (1, 1): "down-right",
+}
+
+ORTHOGONAL = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+DIAGONAL = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+
+def sign(n):
+    return (n > 0) - (n < 0)
+
+
+def scan_row(grid, width, cell, step, goal):
+    """
+    Scans from cell along its row of `grid` (rows are `width` bytes, 1 for a
+    wall, with walls at both ends) in direction `step` (1 or -1). Returns the
+    first jump point: the goal, or an open cell with an open neighbor above
+    or below that is walled off behind it. Returns None on reaching a wall.
+
+    Each step is a C-level search of the grid bytes rather than a Python
+    loop over cells.
+    """
+    if step > 0:
+        wall = grid.find(1, cell + 1)
+        found = [c for c in (
+            grid.find(b"\x01\x00", cell - width, wall - width) + 1 + width,
+            grid.find(b"\x01\x00", cell + width, wall + width) + 1 - width,
+        ) if cell < c < wall]
+        if cell < goal < wall:
+            found.append(goal)
+        return min(found) if found else None
+
+    wall = grid.rfind(1, 0, cell)
+    found = [c for c in (
+        grid.rfind(b"\x00\x01", wall + 1 - width, cell + 1 - width) + width,
+        grid.rfind(b"\x00\x01", wall + 1 + width, cell + 1 + width) - width,
+    ) if wall < c < cell]
+    if wall < goal < cell:
+        found.append(goal)
+    return max(found) if found else None
+
+
+class JumpPointSearch():
+    """
+    One search over a maze.Maze; `diagonal` allows 8-connected moves.
+    """
+
+    def __init__(self, maze, diagonal=False):
+        self.maze = maze
+        self.diagonal = diagonal
+        self.walls = maze.walls
+        self.stride = maze.stride
+        self.height = len(self.walls) // self.stride
+        self.goal = maze.index(maze.goal)
+        self.num_explored = 0
+        self.explored = bytearray(len(self.walls))
+
+        # The grid transposed, so that vertical scans also search along rows
+        self.columns = bytearray().join(
+            self.walls[j::self.stride] for j in range(self.stride)
+        )
+        self.goal_column = self.transpose(self.goal)
+
+        # Whether a horizontal scan from a cell finds a jump point: 0 not
+        # yet known, 1 no, 2 yes
+        self.row_jumps = bytearray(len(self.walls))
+
+    def transpose(self, cell):
+        row, col = divmod(cell, self.stride)
+        return col * self.height + row
+
+    def untranspose(self, cell):
+        col, row = divmod(cell, self.height)
+        return row * self.stride + col
+
+    def direction(self, parent, cell):
+        """(row, column) step from parent towards cell."""
+        parent_row, parent_col = divmod(parent, self.stride)
+        row, col = divmod(cell, self.stride)
+        return (sign(row - parent_row), sign(col - parent_col))
+
+    def directions(self, parent, cell):
+        """
+        Directions to scan from cell when it was reached from parent.
+        """
+        if parent is None:
+            return ORTHOGONAL + DIAGONAL if self.diagonal else ORTHOGONAL
+        dr, dc = self.direction(parent, cell)
+        if dr and dc:
+            return [(dr, 0), (0, dc), (dr, dc)]
+        if not self.diagonal:
+            if dr:
+                return [(dr, 0), (0, 1), (0, -1)]
+            return [(0, dc), (1, 0), (-1, 0)]
+        if dr:
+            return [(dr, 0), (dr, 1), (dr, -1), (0, 1), (0, -1)]
+        return [(0, dc), (1, dc), (-1, dc), (1, 0), (-1, 0)]
+
+    def scan(self, cell, dr, dc):
+        """
+        Returns the first jump point from cell in a straight horizontal
+        (dr = 0) or vertical (dc = 0) line, ignoring the 4-connected row
+        checks, or None.
+        """
+        if not dr:
+            return scan_row(self.walls, self.stride, cell, dc, self.goal)
+        point = scan_row(self.columns, self.height, self.transpose(cell), dr,
+                         self.goal_column)
+        return None if point is None else self.untranspose(point)
+
+    def row_jump(self, cell):
+        """
+        Returns whether a horizontal scan either way from cell finds a jump
+        point.
+        """
+        known = self.row_jumps[cell]
+        if not known:
+            found = (self.scan(cell, 0, 1) is not None
+                     or self.scan(cell, 0, -1) is not None)
+            known = self.row_jumps[cell] = 2 if found else 1
+        return known == 2
+
+    def jump(self, cell, direction):
+        """
+        Returns the next jump point from cell in `direction`, or None.
+        """
+        dr, dc = direction
+        walls = self.walls
+        if not dr:
+            return self.scan(cell, 0, dc)
+        if not dc:
+            limit = self.scan(cell, dr, 0)
+            if self.diagonal:
+                return limit
+            # A 4-connected vertical scan also stops at the first row with
+            # a jump point to either side
+            step = dr * self.stride
+            while True:
+                cell += step
+                if walls[cell]:
+                    return None
+                if cell == limit or self.row_jump(cell):
+                    return cell
+
+        goal = self.goal
+        vertical = dr * self.stride
+        while True:
+            if walls[cell + dc] or walls[cell + vertical]:
+                return None
+            cell += vertical + dc
+            if walls[cell]:
+                return None
+            if cell == goal:
+                return cell
+            if (self.scan(cell, 0, dc) is not None
+                    or self.scan(cell, dr, 0) is not None):
+                return cell
+
+    def distance(self, a, b):
+        """Shortest open-grid distance between two cells."""
+        a_row, a_col = divmod(a, self.stride)
+        b_row, b_col = divmod(b, self.stride)
+        rows, cols = abs(a_row - b_row), abs(a_col - b_col)
+        if self.diagonal:
+            return max(rows, cols) + (math.sqrt(2) - 1) * min(rows, cols)
+        return rows + cols
+
+    def solve(self):
+        """
+        Returns (actions, cells) for a shortest path from the maze's start
+        to its goal, as Maze.solve does. Raises an exception if there is
+        none.
+        """
+        start = self.maze.index(self.maze.start)
+        goal = self.goal
+        parents = {start: None}
+        costs = {start: 0}
+        counter = itertools.count()
+        frontier = [(self.distance(start, goal), next(counter), start)]
+
+        while frontier:
+            _, _, cell = heapq.heappop(frontier)
+            if self.explored[cell]:
+                continue
+            self.explored[cell] = 1
+            self.num_explored += 1
+            if cell == goal:
+                return self.path(parents, goal)
+
+            for direction in self.directions(parents[cell], cell):
+                point = self.jump(cell, direction)
+                if point is None or self.explored[point]:
+                    continue
+                cost = costs[cell] + self.distance(cell, point)
+                if cost < costs.get(point, math.inf):
+                    costs[point] = cost
+                    parents[point] = cell
+                    heapq.heappush(frontier, (cost + self.distance(point, goal),
+                                              next(counter), point))
+
+        raise Exception("no solution")
+
+    def path(self, parents, goal):
+        """
+        Expands the jump points leading to goal into single moves.
+        """
+        points = []
+        cell = goal
+        while cell is not None:
+            points.append(cell)
+            cell = parents[cell]
+        points.reverse()
+
+        actions = []
+        cells = []
+        for a, b in zip(points, points[1:]):
+            dr, dc = self.direction(a, b)
+            action = ACTIONS[(dr, dc)]
+            while a != b:
+                a += dr * self.stride + dc
+                actions.append(action)
+                cells.append(self.maze.position(a))
+        return (actions, cells)
+
+
+def generate(size, density, seed):
+    """
+    Returns the text of a size x size map of open floor with rectangular
+    wall blocks covering about `density` of it, start in the top-left
+    corner and goal in the bottom-right.
+    """
+    rng = random.Random(seed)
+    grid = [bytearray(b" " * size) for _ in range(size)]
+    target = int(density * size * size)
+    walls = 0
+    while walls < target:
+        height, width = rng.randint(1, 20), rng.randint(1, 20)
+        i, j = rng.randrange(size), rng.randrange(size)
+        for row in grid[i:i + height]:
+            block = row[j:j + width]
+            walls += len(block) - block.count(b"#")
+            row[j:j + width] = b"#" * len(block)
+    grid[0][0] = ord("A")
+    grid[-1][-1] = ord("B")
+    return "\n".join(row.decode() for row in grid) + "\n"
+
+
+def bench(args):
+    from maze import Maze
+
+    for n in range(args.maps):
+        text = generate(args.size, args.density, args.seed + n)
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write(text)
+        try:
+            maze = Maze(f.name)
+        finally:
+            os.remove(f.name)
+        print(f"Map {n + 1}: {args.size}x{args.size}, density {args.density}")
+        for strategy in ("bfs", "astar", "jps", "jps8"):
+            start = time.perf_counter()
+            try:
+                maze.solve(strategy)
+            except Exception as e:
+                print(f"{strategy:>6}: {e}")
+                continue
+            elapsed = time.perf_counter() - start
+            print(f"{strategy:>6}: {len(maze.solution[0])} moves, "
+                  f"{maze.num_explored} explored, {elapsed:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="jps.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+    parser_bench = commands.add_parser("bench", help="compare with BFS and A*")
+    parser_bench.add_argument("--size", type=int, default=2000)
+    parser_bench.add_argument("--density", type=float, default=0.1)
+    parser_bench.add_argument("--maps", type=int, default=1)
+    parser_bench.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    bench(args)
+
+
+if __name__ == "__main__":
+    main()
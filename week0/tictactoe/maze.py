@@ -1,35 +1,90 @@
+import heapq
+import itertools
+import math
 import sys
+from collections import deque
+
+import jps
+
+# Search strategies accepted by Maze.solve
+STRATEGIES = ("dfs", "bfs", "greedy", "astar", "jps", "jps8")
+
+# Maps each byte of a maze file to 1 for a wall and 0 for open floor
+WALL_TABLE = bytes(0 if chr(b) in " AB" else 1 for b in range(256))
+
+# Palette indices and colors of output_image
+GAP, WALL, START, GOAL, SOLUTION, EXPLORED, EMPTY = range(7)
+PALETTE = [
+    (0, 0, 0),
+    (40, 40, 40),
+    (255, 0, 0),
+    (0, 171, 28),
+    (220, 235, 113),
+    (212, 97, 85),
+    (237, 240, 252),
+]
+
+# Palette index of a cell from its wall flag, or from wall + 2 * explored
+WALL_COLORS = bytes([EMPTY, WALL]).ljust(256, b"\0")
+EXPLORED_COLORS = bytes([EMPTY, WALL, EXPLORED, WALL]).ljust(256, b"\0")
 
 class Node():
-    def __init__(self, state, parent, action):
+    def __init__(self, state, parent, action, cost=0):
         self.state = state
         self.parent = parent
         self.action = action
+        self.cost = cost
 
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+        self.states = {}
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
     def empty(self):
         return (len(self.frontier) == 0)
     def remove(self):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
+            node = self.frontier.pop()
+            self.discard(node.state)
             return node
+    def discard(self, state):
+        count = self.states[state]
+        if count == 1:
+            del self.states[state]
+        else:
+            self.states[state] = count - 1
         
 class QueueFrontier(StackFrontier):
     def remove(self):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
+            node = self.frontier.popleft()
+            self.discard(node.state)
+            return node
+
+class PriorityFrontier(StackFrontier):
+    """Removes the node with the lowest `priority(node)`, oldest first on ties."""
+    def __init__(self, priority):
+        super().__init__()
+        self.frontier = []
+        self.priority = priority
+        self.counter = itertools.count()
+    def add(self, node):
+        heapq.heappush(self.frontier, (self.priority(node), next(self.counter), node))
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = heapq.heappop(self.frontier)[2]
+            self.discard(node.state)
             return node
         
 
@@ -52,77 +107,126 @@ class Maze():
         self.height = len(contents)
         self.width = max(len(line) for line in contents)
 
-        # Keep track of walls
-        self.walls = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                try:
-                    if contents[i][j] == "A":
-                        self.start = (i, j)
-                        row.append(False)
-                    elif contents[i][j] == "B":
-                        self.goal = (i, j)
-                        row.append(False)
-                    elif contents[i][j] == " ":
-                        row.append(False)
-                    else:
-                        row.append(True)
-                except IndexError:
-                    row.append(False)
-            self.walls.append(row)
+        # Keep track of walls as one byte per cell, 1 for a wall, row by
+        # row. Cells are numbered in a grid with a border of walls around
+        # the maze so that neighbors need no bounds checks. Short lines are
+        # padded with open floor.
+        self.stride = self.width + 2
+        border = b"#" * self.stride
+        padded = border + b"".join(
+            b"#" + line.ljust(self.width).encode("ascii", "replace") + b"#"
+            for line in contents
+        ) + border
+        self.walls = bytearray(padded.translate(WALL_TABLE))
+        self.start = self.position(padded.index(b"A"))
+        self.goal = self.position(padded.index(b"B"))
+
+        # Cell offset of each move
+        self.moves = [
+            ("up", -self.stride),
+            ("down", self.stride),
+            ("left", -1),
+            ("right", 1)
+        ]
 
         self.solution = None
 
 
     def print(self):
-        solution = self.solution[1] if self.solution is not None else None
+        # Solution columns in each row
+        marks = {}
+        if self.solution is not None:
+            for i, j in self.solution[1]:
+                marks.setdefault(i, []).append(j)
+
         print()
-        for i, row in enumerate(self.walls):
-            for j, col in enumerate(row):
-                if col:
-                    print("â–ˆ", end="")
-                elif (i, j) == self.start:
-                    print("A", end="")
-                elif (i, j) == self.goal:
-                    print("B", end="")
-                elif solution is not None and (i, j) in solution:
-                    print("*", end="")
-                else:
-                    print(" ", end="")
-            print()
+        for i in range(self.height):
+            row = ["â–ˆ" if wall else " " for wall in self.interior_row(self.walls, i)]
+            for j in marks.get(i, ()):
+                row[j] = "*"
+            for mark, (mark_i, mark_j) in (("A", self.start), ("B", self.goal)):
+                if mark_i == i:
+                    row[mark_j] = mark
+            print("".join(row))
         print()
 
 
-    def neighbors(self, state):
-        row, col = state
-        candidates = [
-            ("up", (row - 1, col)),
-            ("down", (row + 1, col)),
-            ("left", (row, col - 1)),
-            ("right", (row, col + 1))
-        ]
+    def index(self, position):
+        """Cell number of an (i, j) position."""
+        i, j = position
+        return (i + 1) * self.stride + j + 1
+
+
+    def position(self, cell):
+        """(i, j) position of a cell number."""
+        i, j = divmod(cell, self.stride)
+        return (i - 1, j - 1)
 
-        result = []
-        for action, (r, c) in candidates:
-            if 0 <= r < self.height and 0 <= c < self.width and not self.walls[r][c]:
-                result.append((action, (r, c)))
-        return result
 
+    def interior_row(self, grid, i):
+        """Row i of a per-cell grid, without the border."""
+        start = self.index((i, 0))
+        return grid[start:start + self.width]
 
-    def solve(self):
-        """Finds a solution to maze, if one exists."""
+
+    def interior(self, grid):
+        """A per-cell grid without the border, row by row."""
+        return b"".join(self.interior_row(grid, i) for i in range(self.height))
+
+
+    def neighbors(self, cell):
+        walls = self.walls
+        return [(action, cell + offset) for action, offset in self.moves
+                if not walls[cell + offset]]
+
+
+    def distance(self, cell):
+        """Manhattan distance from a cell to the goal."""
+        i, j = divmod(cell, self.stride)
+        return abs(i - self.goal[0] - 1) + abs(j - self.goal[1] - 1)
+
+
+    def frontier(self, strategy):
+        if strategy == "dfs":
+            return StackFrontier()
+        if strategy == "bfs":
+            return QueueFrontier()
+        if strategy == "greedy":
+            return PriorityFrontier(lambda node: self.distance(node.state))
+        if strategy == "astar":
+            return PriorityFrontier(lambda node: (node.cost + self.distance(node.state), -node.cost))
+        raise ValueError(f"unknown strategy {strategy!r}, expected one of {STRATEGIES}")
+
+
+    def solve(self, strategy="dfs"):
+        """
+        Finds a solution to maze, if one exists, using depth-first ("dfs"),
+        breadth-first ("bfs"), greedy best-first ("greedy") or A* ("astar")
+        search, or Jump Point Search with 4-connected ("jps") or
+        8-connected ("jps8") moves. BFS, A* and JPS find shortest paths.
+        """
+
+        if strategy in ("jps", "jps8"):
+            search = jps.JumpPointSearch(self, diagonal=strategy == "jps8")
+            self.explored = search.explored
+            self.solution = search.solve()
+            self.num_explored = search.num_explored
+            return
 
         # Keep track of number of states explored
         self.num_explored = 0
 
         # Initialize frontier to just the starting position
-        start = Node(state=self.start, parent=None, action=None)
-        frontier = StackFrontier()
+        start = Node(state=self.index(self.start), parent=None, action=None)
+        goal = self.index(self.goal)
+        frontier = self.frontier(strategy)
         frontier.add(start)
 
-        # Initialize an empty explored set
-        self.explored = set()
+        # Cheapest known cost to reach each state, for A*
+        costs = {start.state: 0}
+
+        # Initialize an empty explored set, one flag per cell
+        self.explored = bytearray(len(self.walls))
 
         # Keep looping until solution found
         while True:
@@ -131,17 +235,20 @@ class Maze():
             if frontier.empty():
                 raise Exception("no solution")
 
-            # Choose a node from the frontier
+            # Choose a node from the frontier, skipping entries that A*
+            # has since reached more cheaply
             node = frontier.remove()
+            if self.explored[node.state]:
+                continue
             self.num_explored += 1
 
             # If node is the goal, then we have a solution
-            if node.state == self.goal:
+            if node.state == goal:
                 actions = []
                 cells = []
                 while node.parent is not None:
                     actions.append(node.action)
-                    cells.append(node.state)
+                    cells.append(self.position(node.state))
                     node = node.parent
                 actions.reverse()
                 cells.reverse()
@@ -149,75 +256,71 @@ class Maze():
                 return
 
             # Mark node as explored
-            self.explored.add(node.state)
+            self.explored[node.state] = 1
 
             # Add neighbors to frontier
             for action, state in self.neighbors(node.state):
-                if not frontier.contains_state(state) and state not in self.explored:
-                    child = Node(state=state, parent=node, action=action)
-                    frontier.add(child)
-
-
-    def output_image(self, filename, show_solution=True, show_explored=False):
+                if self.explored[state]:
+                    continue
+                cost = node.cost + 1
+                if strategy == "astar":
+                    if cost >= costs.get(state, math.inf):
+                        continue
+                    costs[state] = cost
+                elif frontier.contains_state(state):
+                    continue
+                child = Node(state=state, parent=node, action=action, cost=cost)
+                frontier.add(child)
+
+
+    def output_image(self, filename, show_solution=True, show_explored=False, cell_size=50):
         from PIL import Image, ImageDraw
-        cell_size = 50
-        cell_border = 2
-
-        # Create a blank canvas
-        img = Image.new(
-            "RGBA",
-            (self.width * cell_size, self.height * cell_size),
-            "black"
-        )
-        draw = ImageDraw.Draw(img)
+        cell_border = 2 if cell_size >= 8 else 0
 
+        # One palette index per cell. Walls and explored flags are bytes of
+        # 0 or 1, so walls + 2 * explored as big integers packs both flags
+        # into each byte without carries.
+        walls = self.interior(self.walls)
         solution = self.solution[1] if self.solution is not None else None
-        for i, row in enumerate(self.walls):
-            for j, col in enumerate(row):
-
-                # Walls
-                if col:
-                    fill = (40, 40, 40)
-
-                # Start
-                elif (i, j) == self.start:
-                    fill = (255, 0, 0)
-
-                # Goal
-                elif (i, j) == self.goal:
-                    fill = (0, 171, 28)
-
-                # Solution
-                elif solution is not None and show_solution and (i, j) in solution:
-                    fill = (220, 235, 113)
-
-                # Explored
-                elif solution is not None and show_explored and (i, j) in self.explored:
-                    fill = (212, 97, 85)
-
-                # Empty cell
-                else:
-                    fill = (237, 240, 252)
-
-                # Draw cell
-                draw.rectangle(
-                    ([(j * cell_size + cell_border, i * cell_size + cell_border),
-                      ((j + 1) * cell_size - cell_border, (i + 1) * cell_size - cell_border)]),
-                    fill=fill
-                )
+        if solution is not None and show_explored:
+            explored = self.interior(self.explored)
+            packed = int.from_bytes(walls, "big") + 2 * int.from_bytes(explored, "big")
+            cells = bytearray(packed.to_bytes(len(walls), "big").translate(EXPLORED_COLORS))
+        else:
+            cells = bytearray(walls.translate(WALL_COLORS))
+        if solution is not None and show_solution:
+            for i, j in solution:
+                cells[i * self.width + j] = SOLUTION
+        cells[self.start[0] * self.width + self.start[1]] = START
+        cells[self.goal[0] * self.width + self.goal[1]] = GOAL
+
+        # Scale up one pixel per cell, then draw the gaps between cells
+        img = Image.frombytes("P", (self.width, self.height), bytes(cells))
+        img.putpalette([value for color in PALETTE for value in color])
+        img = img.resize((self.width * cell_size, self.height * cell_size), Image.NEAREST)
+        if cell_border:
+            draw = ImageDraw.Draw(img)
+            for j in range(self.width + 1):
+                x = j * cell_size
+                draw.rectangle([(x - cell_border + 1, 0), (x + cell_border - 1, img.height)], fill=GAP)
+            for i in range(self.height + 1):
+                y = i * cell_size
+                draw.rectangle([(0, y - cell_border + 1), (img.width, y + cell_border - 1)], fill=GAP)
 
         img.save(filename)
 
 
-if len(sys.argv) != 2:
-    sys.exit("Usage: python maze.py maze.txt")
-
-m = Maze(sys.argv[1])
-print("Maze:")
-m.print()
-print("Solving...")
-m.solve()
-print("States Explored:", m.num_explored)
-print("Solution:")
-m.print()
-m.output_image("maze.png", show_explored=True)        
\ No newline at end of file
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3) or (len(sys.argv) == 3 and sys.argv[2] not in STRATEGIES):
+        sys.exit(f"Usage: python maze.py maze.txt [{'|'.join(STRATEGIES)}]")
+
+    m = Maze(sys.argv[1])
+    print("Maze:")
+    m.print()
+    print("Solving...")
+    m.solve(sys.argv[2] if len(sys.argv) == 3 else "dfs")
+    print("States Explored:", m.num_explored)
+    print("Solution:")
+    m.print()
+    m.output_image("maze.png", show_explored=True)
+        
\ No newline at end of file
@@ -1,9 +1,15 @@
 import pygame
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import tictactoe as ttt
 
+# Board size and win length: python runner.py [size] [k]
+board_size = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+win_length = int(sys.argv[2]) if len(sys.argv) > 2 else board_size
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -15,18 +21,46 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+tile_size = min(80, 240 // board_size)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
-board = ttt.initial_state()
-ai_turn = False
+board = ttt.initial_state(board_size)
+
+# The AI searches on a background thread; the loop polls its future each
+# frame and can cancel it through the event
+ai_executor = ThreadPoolExecutor(max_workers=1)
+ai_future = None
+ai_cancel = None
+ai_started = None
+
+# Shortest time the AI appears to think, so its move is not instant
+ai_min_delay = 0.5
+
+clock = pygame.time.Clock()
+
+
+def cancel_ai():
+    global ai_future, ai_cancel
+    if ai_cancel is not None:
+        ai_cancel.set()
+    ai_future = None
+    ai_cancel = None
+
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            cancel_ai()
+            ai_executor.shutdown(wait=False)
             sys.exit()
-            
+
+        # R or Escape resets the game, abandoning any search in progress
+        if event.type == pygame.KEYDOWN and event.key in (pygame.K_r, pygame.K_ESCAPE):
+            cancel_ai()
+            user = None
+            board = ttt.initial_state(board_size)
 
     screen.fill(black)
 
@@ -68,13 +102,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (board_size / 2 * tile_size),
+                       height / 2 - (board_size / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(board_size):
             row = []
-            for j in range(3):
+            for j in range(board_size):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -90,12 +123,12 @@ while True:
                 row.append(rect)
             tiles.append(row)
 
-        game_over = ttt.terminal(board)
+        game_over = ttt.terminal(board, win_length)
         player = ttt.player(board)
 
         # Show title
         if game_over:
-            winner = ttt.winner(board)
+            winner = ttt.winner(board, win_length)
             if winner is None:
                 title = f"Game Over: Tie."
             else:
@@ -103,28 +136,34 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            dots = int(2 * time.time()) % 4
+            title = "Computer thinking" + "." * dots
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Start the AI search, or apply its move once it is ready
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
+            if ai_future is None:
+                ai_cancel = threading.Event()
+                ai_started = time.time()
+                ai_future = ai_executor.submit(
+                    ttt.minimax, [row.copy() for row in board], win_length,
+                    cancel=ai_cancel
+                )
+            elif ai_future.done() and time.time() - ai_started >= ai_min_delay:
+                move = ai_future.result()
+                ai_future = None
+                ai_cancel = None
                 board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(board_size):
+                for j in range(board_size):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
@@ -140,8 +179,9 @@ while True:
                 mouse = pygame.mouse.get_pos()
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
+                    cancel_ai()
                     user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
+                    board = ttt.initial_state(board_size)
 
     pygame.display.flip()
+    clock.tick(60)
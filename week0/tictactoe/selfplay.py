@@ -0,0 +1,187 @@
+"""
+Headless self-play and benchmark harness for the Tic Tac Toe engines.
+
+    python selfplay.py ENGINE_X ENGINE_O [--games N] [--size 3] [--k K]
+                       [--time-limit S] [--random-plies P] [--seed S]
+
+plays N games between two engines and reports results, nodes searched,
+nodes/sec and per-move latency percentiles for each. Engines:
+
+    naive      plain minimax over every line, no pruning or caching
+    alphabeta  bitboard alpha-beta with the symmetric transposition table
+    book       lookup in the precomputed perfect-play table (3x3 only)
+    engine     iterative-deepening search used for other board sizes
+    minimax    tictactoe.minimax, whichever of the above it uses
+    random     a uniformly random legal move
+
+The first P plies of each game are random so that games differ.
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import bitboard
+import book
+import engine
+import tictactoe as ttt
+
+
+def naive(board, k, time_limit):
+    """
+    Exhaustive minimax without pruning, as a baseline.
+    """
+    nodes = 0
+
+    def value(board):
+        nonlocal nodes
+        nodes += 1
+        if ttt.terminal(board, k):
+            return ttt.utility(board, k)
+        values = [value(ttt.result(board, action)) for action in ttt.actions(board)]
+        return max(values) if ttt.player(board) == ttt.X else min(values)
+
+    choose = max if ttt.player(board) == ttt.X else min
+    move = choose(sorted(ttt.actions(board)),
+                  key=lambda action: value(ttt.result(board, action)))
+    return move, nodes
+
+
+def alphabeta(board, k, time_limit):
+    before = bitboard.nodes
+    move = bitboard.best_move(bitboard.from_lists(board))
+    return move, bitboard.nodes - before
+
+
+def book_move(board, k, time_limit):
+    # One node for the lookup, plus any search for a position not in the book
+    before = bitboard.nodes
+    move = book.best_move(bitboard.from_lists(board))
+    return move, 1 + bitboard.nodes - before
+
+
+def engine_move(board, k, time_limit):
+    size = len(board)
+    x, o = engine.from_lists(board)
+    search = engine.Search(engine.geometry(size, k), time_limit)
+    if x.bit_count() <= o.bit_count():
+        cell = search.best_move(x, o)
+    else:
+        cell = search.best_move(o, x)
+    return divmod(cell, size), search.nodes
+
+
+def minimax(board, k, time_limit):
+    """
+    Plays as tictactoe.minimax does, through the engine it picks for the
+    board, so that its search work is counted.
+    """
+    if len(board) == 3 and k == 3:
+        return book_move(board, k, time_limit)
+    return engine_move(board, k, time_limit)
+
+
+def random_move(board, k, time_limit):
+    return random.choice(sorted(ttt.actions(board))), 0
+
+
+ENGINES = {
+    "naive": naive,
+    "alphabeta": alphabeta,
+    "book": book_move,
+    "engine": engine_move,
+    "minimax": minimax,
+    "random": random_move,
+}
+
+
+class Record():
+    """
+    Moves, nodes and latencies of one engine across all games.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.nodes = 0
+        self.latencies = []
+
+    def report(self):
+        total = sum(self.latencies)
+        rate = self.nodes / total if total else 0.0
+        print(f"{self.name}: {len(self.latencies)} moves, {self.nodes} nodes, "
+              f"{rate:,.0f} nodes/sec")
+        if self.latencies:
+            latencies = sorted(self.latencies)
+            print("    latency " + ", ".join(
+                f"p{p}={1000 * percentile(latencies, p):.3f}ms"
+                for p in (50, 90, 99, 100)
+            ))
+
+
+def percentile(ordered, p):
+    """
+    Returns the p-th percentile of a sorted list (nearest rank).
+    """
+    rank = max(1, -(-p * len(ordered) // 100))
+    return ordered[rank - 1]
+
+
+def play(players, records, size, k, time_limit, random_plies):
+    """
+    Plays one game and returns the winner ("X", "O" or None).
+    """
+    bitboard.transpositions.clear()
+    board = ttt.initial_state(size)
+    ply = 0
+    while not ttt.terminal(board, k):
+        current = ttt.player(board)
+        if ply < random_plies:
+            move = random.choice(sorted(ttt.actions(board)))
+        else:
+            start = time.perf_counter()
+            move, nodes = players[current](board, k, time_limit)
+            records[current].latencies.append(time.perf_counter() - start)
+            records[current].nodes += nodes
+        board = ttt.result(board, move)
+        ply += 1
+    return ttt.winner(board, k)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="selfplay.py")
+    parser.add_argument("x", choices=ENGINES, help="engine playing X")
+    parser.add_argument("o", choices=ENGINES, help="engine playing O")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--k", type=int, default=None)
+    parser.add_argument("--time-limit", type=float, default=1.0,
+                        help="seconds per move for the engine search")
+    parser.add_argument("--random-plies", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    k = args.k or args.size
+    if args.size != 3 or k != 3:
+        for name in (args.x, args.o):
+            if name in ("alphabeta", "book"):
+                sys.exit(f"{name} only plays the 3x3 game")
+
+    # Load the book up front so its first use is not timed as a move
+    book.table()
+    random.seed(args.seed)
+    players = {ttt.X: ENGINES[args.x], ttt.O: ENGINES[args.o]}
+    records = {ttt.X: Record(f"X ({args.x})"), ttt.O: Record(f"O ({args.o})")}
+    results = {ttt.X: 0, ttt.O: 0, None: 0}
+    for _ in range(args.games):
+        results[play(players, records, args.size, k, args.time_limit,
+                     args.random_plies)] += 1
+
+    print(f"{args.games} games on {args.size}x{args.size}, {k} in a row: "
+          f"X {results[ttt.X]}, O {results[ttt.O]}, draws {results[None]}")
+    for record in records.values():
+        record.report()
+
+
+if __name__ == "__main__":
+    main()
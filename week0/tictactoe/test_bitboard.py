@@ -0,0 +1,34 @@
+import bitboard
+import tictactoe as ttt
+
+
+def reachable():
+    """Returns every list-of-lists board reachable from the initial state."""
+    seen = {}
+    stack = [ttt.initial_state()]
+    while stack:
+        board = stack.pop()
+        key = str(board)
+        if key in seen:
+            continue
+        seen[key] = board
+        if not ttt.terminal(board):
+            stack.extend(ttt.result(board, action) for action in ttt.actions(board))
+    return list(seen.values())
+
+
+def test_matches_list_board():
+    boards = reachable()
+    assert len(boards) == 5478
+    for board in boards:
+        position = bitboard.from_lists(board)
+        assert bitboard.to_lists(position) == board
+        assert bitboard.player(position) == ttt.player(board)
+        assert bitboard.actions(position) == ttt.actions(board)
+        assert bitboard.winner(position) == ttt.winner(board)
+        assert bitboard.terminal(position) == ttt.terminal(board)
+        assert bitboard.utility(position) == ttt.utility(board)
+        if not ttt.terminal(board):
+            for action in ttt.actions(board):
+                assert (bitboard.to_lists(bitboard.result(position, action))
+                        == ttt.result(board, action))
@@ -0,0 +1,14 @@
+import bitboard
+import book
+
+
+def test_book_matches_search():
+    assert book.verify() == 0
+
+
+def test_best_move_keeps_the_draw():
+    # Perfect play from the empty board by both sides is a draw
+    position = (0, 0)
+    while not bitboard.terminal(position):
+        position = bitboard.result(position, book.best_move(position))
+    assert bitboard.utility(position) == 0
@@ -0,0 +1,111 @@
+import heapq
+import math
+import random
+
+import pytest
+
+from maze import Maze
+
+STEPS = {
+    "up": (-1, 0), "down": (1, 0), "left": (0, -1), "right": (0, 1),
+    "up-left": (-1, -1), "up-right": (-1, 1),
+    "down-left": (1, -1), "down-right": (1, 1),
+}
+
+
+def random_maze(tmp_path, rng, n):
+    """Writes a random maze file and returns it loaded."""
+    height, width = rng.randint(1, 12), rng.randint(2, 12)
+    density = rng.choice((0.1, 0.25, 0.4))
+    grid = [["#" if rng.random() < density else " " for _ in range(width)]
+            for _ in range(height)]
+    cells = rng.sample([(i, j) for i in range(height) for j in range(width)], 2)
+    for (i, j), mark in zip(cells, "AB"):
+        grid[i][j] = mark
+    path = tmp_path / f"maze{n}.txt"
+    path.write_text("\n".join("".join(row) for row in grid) + "\n")
+    return Maze(str(path))
+
+
+def open_cell(maze, i, j):
+    return 0 <= i < maze.height and 0 <= j < maze.width and not maze.walls[maze.index((i, j))]
+
+
+def dijkstra8(maze):
+    """Cost of the cheapest 8-connected path, or None."""
+    costs = {maze.start: 0}
+    frontier = [(0, maze.start)]
+    while frontier:
+        cost, (i, j) = heapq.heappop(frontier)
+        if (i, j) == maze.goal:
+            return cost
+        if cost > costs[(i, j)]:
+            continue
+        for di, dj in STEPS.values():
+            if not open_cell(maze, i + di, j + dj):
+                continue
+            if di and dj and not (open_cell(maze, i + di, j) and open_cell(maze, i, j + dj)):
+                continue
+            step = math.sqrt(2) if di and dj else 1
+            if cost + step < costs.get((i + di, j + dj), math.inf) - 1e-9:
+                costs[(i + di, j + dj)] = cost + step
+                heapq.heappush(frontier, (cost + step, (i + di, j + dj)))
+    return None
+
+
+def solve(maze, strategy):
+    """Returns maze.solve's solution, or None if it finds there is none."""
+    try:
+        maze.solve(strategy)
+    except Exception as e:
+        assert str(e) == "no solution"
+        return None
+    return maze.solution
+
+
+def path_cost(maze, solution):
+    """Checks that a solution is a legal walk to the goal and returns its cost."""
+    actions, cells = solution
+    i, j = maze.start
+    cost = 0
+    for action, cell in zip(actions, cells):
+        di, dj = STEPS[action]
+        if di and dj:
+            assert open_cell(maze, i + di, j) and open_cell(maze, i, j + dj)
+            cost += math.sqrt(2)
+        else:
+            cost += 1
+        i, j = i + di, j + dj
+        assert (i, j) == cell and open_cell(maze, i, j)
+    assert (i, j) == maze.goal
+    return cost
+
+
+def test_jps_matches_bfs(tmp_path):
+    rng = random.Random(0)
+    unsolvable = 0
+    for n in range(400):
+        maze = random_maze(tmp_path, rng, n)
+        expected = solve(maze, "bfs")
+        found = solve(maze, "jps")
+        if expected is None:
+            unsolvable += 1
+            assert found is None
+        else:
+            assert path_cost(maze, found) == len(expected[0])
+    assert unsolvable > 0
+
+
+def test_jps8_matches_dijkstra(tmp_path):
+    rng = random.Random(1)
+    unsolvable = 0
+    for n in range(400):
+        maze = random_maze(tmp_path, rng, n)
+        expected = dijkstra8(maze)
+        found = solve(maze, "jps8")
+        if expected is None:
+            unsolvable += 1
+            assert found is None
+        else:
+            assert path_cost(maze, found) == pytest.approx(expected)
+    assert unsolvable > 0
@@ -2,19 +2,17 @@
 Tic Tac Toe Player
 """
 
-import math
-import copy
-import random
+import bitboard
+import book
+import engine
 
 X = "X"
 O = "O"
 EMPTY = None
 
 
-def initial_state():
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+def initial_state(size=3):
+    return [[EMPTY] * size for _ in range(size)]
 
 
 def player(board):
@@ -38,16 +36,23 @@ def actions(board):
 
 
 def result(board, action):
-    current = player(board)
-    deep_board = copy.deepcopy(board)
     row, cell = action
-    deep_board[row][cell] = current
-    return deep_board
+    if not (0 <= row < len(board) and 0 <= cell < len(board)) or board[row][cell] is not EMPTY:
+        raise ValueError(f"invalid action {action}")
+    current = player(board)
+    new_board = [list(r) for r in board]
+    new_board[row][cell] = current
+    return new_board
 
 
 
 
-def winner(board):
+def winner(board, k=None):
+    """
+    Returns the player with k in a row (by default a full line), if any.
+    """
+    if k is not None and k != len(board):
+        return line_winner(board, k)
     row = check_row(board)
     if row is not None:
         return row
@@ -63,57 +68,47 @@ def winner(board):
     return None
 
 
-def terminal(board):
-    won = winner(board)
+def terminal(board, k=None):
+    won = winner(board, k)
     if won is not None:
         return True
     return check_draw(board)
 
 
-def utility(board):
-    won = winner(board)
+def utility(board, k=None):
+    won = winner(board, k)
     if won is not None:
         return 1 if won == X else -1
     return 0
 
 
-def minimax(board):
-    currentplayer = player(board)
-    scores = []
-    if terminal(board):
-        return None
-    allactions = actions(board)
-    if not allactions:
-        return None
-    for action in allactions:
-        newboard = result(board, action)
-        if terminal(newboard):
-            score = utility(newboard)
-        else:
-            _ = newboard
-            while not terminal(_):
-                move = minimax(_)
-                _ = result(_, move)
-            score = utility(_)
-        scores.append((action, score))
-    random.shuffle(scores)
-    for one in scores:
-        if one[1] == 1:
-            print(one)
-
-    if currentplayer == X:
-        return max(scores, key=lambda x: x[1])[0]
-    else:
-        return min(scores, key=lambda x: x[1])[0]
-    
- 
-        
-
-    
+def minimax(board, k=None, time_limit=1.0, cancel=None):
+    """
+    Returns the optimal action for the current player on the board.
 
-    
+    The classic 3x3 game is a lookup in the precomputed perfect-play
+    table. Other sizes and win lengths use a depth-limited engine search
+    of about `time_limit` seconds, which stops early once the optional
+    `cancel` event is set.
+    """
+    size = len(board)
+    if k is None:
+        k = size
+    if size == 3 and k == 3:
+        return book.best_move(bitboard.from_lists(board))
+    if terminal(board, k):
+        return None
+    return engine.best_move(board, k, time_limit, cancel)
 
 
+def line_winner(board, k):
+    x, o = engine.from_lists(board)
+    lines = engine.geometry(len(board), k)
+    if lines.wins(x):
+        return X
+    if lines.wins(o):
+        return O
+    return None
 
 
 def check_column(board):
@@ -125,11 +120,9 @@ def check_column(board):
 
 def check_row(board):
     for row in board:
-        if row[0] is not None:
-            if len(set(row)) == 1:
-                return row[0]
-            else:
-                return None
+        if row[0] is not None and len(set(row)) == 1:
+            return row[0]
+    return None
             
 def check_left_diag(board):
     size = len(board)
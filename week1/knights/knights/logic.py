@@ -1,19 +1,108 @@
 import itertools
+import weakref
+
+import sat
+
+# Symbols enumerated together, as bits of one integer, by truth_table_check
+BATCH_SYMBOLS = 14
+
+# Every live sentence, keyed by its class and contents
+interned = weakref.WeakValueDictionary()
 
 
 class Sentence():
+    """
+    Sentences are immutable and hash-consed: constructing a sentence equal
+    to a live one returns that same object, so structurally equal
+    subformulas are shared, equality is identity, and each sentence's hash
+    and symbols are computed once.
+    """
+
+    __slots__ = ("hash", "symbol_set", "__weakref__")
+
+    @classmethod
+    def intern(cls, key, children, symbols=None, **fields):
+        """
+        Returns the live sentence for `key`, or creates one of class cls
+        with the given fields. Its symbols are `symbols`, or else the union
+        of the children's.
+        """
+        sentence = interned.get(key)
+        if sentence is None:
+            sentence = object.__new__(cls)
+            for name, value in fields.items():
+                object.__setattr__(sentence, name, value)
+            if symbols is None:
+                symbols = frozenset().union(*[child.symbol_set for child in children])
+            object.__setattr__(sentence, "hash", hash(key))
+            object.__setattr__(sentence, "symbol_set", symbols)
+            interned[key] = sentence
+        return sentence
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __eq__(self, other):
+        return self is other
+
+    def __hash__(self):
+        return self.hash
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence in a model that may leave symbols
+        unassigned. Returns True or False if every completion of the model
+        agrees, otherwise None.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.symbol_set)
+
+    def encode(self, cnf):
+        """
+        Returns a literal of `cnf` that is true exactly when the sentence
+        is, adding the clauses that define it (Tseitin encoding).
+        """
+        if self not in cnf.encodings:
+            cnf.encodings[self] = self.define(cnf)
+        return cnf.encodings[self]
+
+    def define(self, cnf):
+        """Adds clauses defining a literal for the sentence and returns it."""
+        raise Exception("nothing to encode")
+
+    def require(self, cnf):
+        """Adds clauses to `cnf` that hold only if the sentence is true."""
+        cnf.add([self.encode(cnf)])
+
+    def expression(self, slots):
+        """
+        Returns a Python expression for the sentence over a vector `v` of
+        bools, where symbol `name` is `v[slots[name]]`.
+        """
+        raise Exception("nothing to compile")
+
+    def bits(self, slots):
+        """
+        Returns a Python expression for the sentence over a vector `v` of
+        ints, where bit m of each is the symbol's value in model m and
+        `mask` has a bit set for every model.
+        """
+        raise Exception("nothing to compile")
+
+    def compile(self, symbols=None):
+        """Returns the sentence compiled over `symbols` (default all)."""
+        return Compiled(self, symbols)
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +132,13 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
-    def __init__(self, name):
-        self.name = name
+    def __new__(cls, name):
+        return cls.intern((cls, name), (), frozenset([name]), name=name)
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __reduce__(self):
+        return (type(self), (self.name,))
 
     def __repr__(self):
         return self.name
@@ -62,23 +149,32 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def define(self, cnf):
+        return cnf.variable(self.name)
+
+    def expression(self, slots):
+        return f"v[{slots[self.name]}]"
+
+    def bits(self, slots):
+        return f"v[{slots[self.name]}]"
 
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
+    __slots__ = ("operand",)
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls.intern((cls, operand), (operand,), operand=operand)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __reduce__(self):
+        return (type(self), (self.operand,))
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +182,33 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def define(self, cnf):
+        return -self.operand.encode(cnf)
+
+    def expression(self, slots):
+        return f"(not {self.operand.expression(slots)})"
+
+    def bits(self, slots):
+        return f"(mask ^ {self.operand.bits(slots)})"
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    __slots__ = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return cls.intern((cls, conjuncts), conjuncts, conjuncts=conjuncts)
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    def __reduce__(self):
+        return (type(self), self.conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,35 +217,69 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        raise TypeError("sentences are immutable; build And(*conjuncts, conjunct) "
+                        "or use a KnowledgeBase")
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                         for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def define(self, cnf):
+        literals = [conjunct.encode(cnf) for conjunct in self.conjuncts]
+        if not literals:
+            return cnf.true()
+        if len(literals) == 1:
+            return literals[0]
+        t = cnf.new_variable()
+        for literal in literals:
+            cnf.add([-t, literal])
+        cnf.add([t] + [-literal for literal in literals])
+        return t
+
+    def require(self, cnf):
+        for conjunct in self.conjuncts:
+            conjunct.require(cnf)
+
+    def expression(self, slots):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            conjunct.expression(slots) for conjunct in self.conjuncts
+        ) + ")"
+
+    def bits(self, slots):
+        if not self.conjuncts:
+            return "mask"
+        return "(" + " & ".join(
+            conjunct.bits(slots) for conjunct in self.conjuncts
+        ) + ")"
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return cls.intern((cls, disjuncts), disjuncts, disjuncts=disjuncts)
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    def __reduce__(self):
+        return (type(self), self.disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,30 +288,63 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def define(self, cnf):
+        literals = [disjunct.encode(cnf) for disjunct in self.disjuncts]
+        if not literals:
+            return -cnf.true()
+        if len(literals) == 1:
+            return literals[0]
+        t = cnf.new_variable()
+        for literal in literals:
+            cnf.add([t, -literal])
+        cnf.add([-t] + literals)
+        return t
+
+    def require(self, cnf):
+        cnf.add([disjunct.encode(cnf) for disjunct in self.disjuncts])
+
+    def expression(self, slots):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            disjunct.expression(slots) for disjunct in self.disjuncts
+        ) + ")"
+
+    def bits(self, slots):
+        if not self.disjuncts:
+            return "0"
+        return "(" + " | ".join(
+            disjunct.bits(slots) for disjunct in self.disjuncts
+        ) + ")"
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
-
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return cls.intern((cls, antecedent, consequent), (antecedent, consequent),
+                          antecedent=antecedent, consequent=consequent)
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def __reduce__(self):
+        return (type(self), (self.antecedent, self.consequent))
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +353,55 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is True and consequent is False:
+            return False
+        return None
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def define(self, cnf):
+        antecedent = self.antecedent.encode(cnf)
+        consequent = self.consequent.encode(cnf)
+        t = cnf.new_variable()
+        cnf.add([-t, -antecedent, consequent])
+        cnf.add([t, antecedent])
+        cnf.add([t, -consequent])
+        return t
+
+    def require(self, cnf):
+        cnf.add([-self.antecedent.encode(cnf), self.consequent.encode(cnf)])
+
+    def expression(self, slots):
+        antecedent = self.antecedent.expression(slots)
+        consequent = self.consequent.expression(slots)
+        return f"(not {antecedent} or {consequent})"
+
+    def bits(self, slots):
+        antecedent = self.antecedent.bits(slots)
+        consequent = self.consequent.bits(slots)
+        return f"((mask ^ {antecedent}) | {consequent})"
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
-
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return cls.intern((cls, left, right), (left, right), left=left, right=right)
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def __reduce__(self):
+        return (type(self), (self.left, self.right))
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,48 +412,275 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+    def define(self, cnf):
+        left = self.left.encode(cnf)
+        right = self.right.encode(cnf)
+        t = cnf.new_variable()
+        cnf.add([-t, -left, right])
+        cnf.add([-t, left, -right])
+        cnf.add([t, left, right])
+        cnf.add([t, -left, -right])
+        return t
+
+    def require(self, cnf):
+        left = self.left.encode(cnf)
+        right = self.right.encode(cnf)
+        cnf.add([-left, right])
+        cnf.add([left, -right])
+
+    def expression(self, slots):
+        left = self.left.expression(slots)
+        right = self.right.expression(slots)
+        return f"({left} == {right})"
+
+    def bits(self, slots):
+        left = self.left.bits(slots)
+        right = self.right.bits(slots)
+        return f"(mask ^ {left} ^ {right})"
+
+
+class Compiled():
+    """
+    A sentence compiled to Python bytecode over a vector of symbol values,
+    with symbol `symbols[i]` in slot i.
+    """
+
+    def __init__(self, sentence, symbols=None):
+        if symbols is None:
+            symbols = sorted(sentence.symbol_set)
+        self.symbols = list(symbols)
+        self.slots = {name: i for i, name in enumerate(self.symbols)}
+        self.sentence = sentence
+
+        # Sentences nested too deeply for the Python parser fall back to
+        # walking the sentence tree
+        try:
+            self.function = eval(f"lambda v: {sentence.expression(self.slots)}")
+            self.batch_function = eval(f"lambda v, mask: {sentence.bits(self.slots)}")
+        except (MemoryError, RecursionError, SyntaxError):
+            self.function = self.walk
+            self.batch_function = self.walk_batch
+
+    def walk(self, values):
+        return self.sentence.evaluate(dict(zip(self.symbols, values)))
+
+    def walk_batch(self, columns, mask):
+        result = 0
+        for m in range(mask.bit_length()):
+            if self.walk([bool(column >> m & 1) for column in columns]):
+                result |= 1 << m
+        return result
+
+    def __call__(self, values):
+        """Evaluates the sentence for a sequence of bools, one per slot."""
+        return self.function(values)
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
+    def evaluate(self, model):
+        """Evaluates the sentence in a model mapping symbol names to bools."""
+        try:
+            return self.function([bool(model[name]) for name in self.symbols])
+        except KeyError as e:
+            raise Exception(f"variable {e.args[0]} not in model")
+
+    def batch(self, columns, count):
+        """
+        Evaluates the sentence in `count` models at once. `columns[i]` is
+        an int whose bit m is the value of slot i in model m. Returns an
+        int whose bit m is set if the sentence is true in model m.
+        """
+        return self.batch_function(columns, (1 << count) - 1)
+
+
+def enumeration_columns(n):
+    """
+    Returns columns for Compiled.batch that enumerate all 2 ** n models of
+    n slots: slot i of model m is bit i of m.
+    """
+    count = 1 << n
+    columns = []
+    for i in range(n):
+        period = 2 << i
+        column = ((1 << (1 << i)) - 1) << (1 << i)
+        while period < count:
+            column |= column << period
+            period *= 2
+        columns.append(column)
+    return columns
+
+
+def to_cnf(knowledge):
+    """
+    Returns a sat.CNF that is satisfiable exactly when knowledge is, with
+    one variable per symbol (see `variables`) plus Tseitin variables for
+    subformulas.
+    """
+    cnf = sat.CNF()
+    knowledge.require(cnf)
+    return cnf
 
-        # If model has an assignment for each symbol
-        if not symbols:
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
+def model_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, by checking that knowledge
+    together with not query is unsatisfiable.
+    """
+    solver = sat.Solver()
+    knowledge.require(solver)
+    return not solver.solve([-query.encode(solver)])
+
+
+class KnowledgeBase():
+    """
+    A knowledge base that answers many entailment queries with one SAT
+    solver. Each sentence added is guarded by a selector variable that is
+    assumed true while the sentence is in the knowledge base, so sentences
+    can be retracted and added without rebuilding the solver, and clauses
+    learned for one query speed up the next. Models found along the way
+    are kept, and any query false in one of them is not entailed without
+    asking the solver.
+    """
+
+    def __init__(self, knowledge=None):
+        self.solver = sat.Solver()
+
+        # Selector variable of each sentence, in the order added
+        self.selectors = {}
+
+        # Answers to queries since the knowledge base last changed
+        self.answers = {}
+
+        # Models (symbol name -> bool) satisfying every sentence; retracting
+        # a sentence keeps them valid, adding one does not
+        self.models = []
+
+        if knowledge is not None:
+            if isinstance(knowledge, And):
+                self.add(*knowledge.conjuncts)
+            else:
+                self.add(knowledge)
+
+    def __contains__(self, sentence):
+        return sentence in self.selectors
+
+    @property
+    def conjuncts(self):
+        return list(self.selectors)
+
+    def add(self, *sentences):
+        for sentence in sentences:
+            Sentence.validate(sentence)
+            if sentence in self.selectors:
+                continue
+            selector = self.solver.new_variable()
+            self.solver.add([-selector, sentence.encode(self.solver)])
+            self.selectors[sentence] = selector
+            self.answers.clear()
+            self.models.clear()
+
+    def retract(self, sentence):
+        if sentence not in self.selectors:
+            raise Exception(f"{sentence} not in knowledge base")
+        selector = self.selectors.pop(sentence)
+        self.solver.add([-selector])
+        self.answers.clear()
+
+    def solve(self, assumptions):
+        """
+        Checks if the sentences and assumed literals are satisfiable,
+        keeping the model found if they are.
+        """
+        if not self.solver.solve(list(self.selectors.values()) + assumptions):
+            return False
+        self.models.append({name: self.solver.model[v]
+                            for name, v in self.solver.variables.items()})
+        return True
+
+    def satisfiable(self):
+        """Checks if some model satisfies every sentence."""
+        return bool(self.models) or self.solve([])
+
+    def entails(self, query):
+        """Checks if the knowledge base entails query."""
+        if query not in self.answers:
+            names = query.symbol_set
+            if any(names <= model.keys() and not query.evaluate(model)
+                   for model in self.models):
+                self.answers[query] = False
+            else:
+                self.answers[query] = not self.solve([-query.encode(self.solver)])
+        return self.answers[query]
+
+
+def truth_table_check(knowledge, query):
+    """
+    Checks if knowledge base entails query by enumerating models.
+
+    Branches where the knowledge base is already false or the query
+    already true on a partial model are cut, and the next symbol comes
+    from the undecided conjunct with the fewest unassigned symbols. Once
+    at most BATCH_SYMBOLS symbols remain, all of their models are checked
+    at once as bits of compiled evaluation.
+    """
+    symbols = sorted(knowledge.symbol_set | query.symbol_set)
+
+    # Compiled on reaching the first batch of models, which pruning may
+    # never do
+    compiled = None
+    conjuncts = knowledge.conjuncts if isinstance(knowledge, And) else [knowledge]
+    conjuncts = [(conjunct, sorted(conjunct.symbol_set)) for conjunct in conjuncts]
+
+    def choose(model):
+        """Returns an unassigned symbol of the most constrained conjunct."""
+        best = None
+        for conjunct, names in conjuncts:
+            unassigned = [name for name in names if name not in model]
+            if unassigned and (best is None or len(unassigned) < len(best)):
+                if conjunct.evaluate_partial(model) is None:
+                    best = unassigned
+        if best is None:
+            return next(name for name in symbols if name not in model)
+        return best[0]
+
+    def check_all(model):
+        """Checks entailment in every completion of a partial model."""
+        if knowledge.evaluate_partial(model) is False:
+            return True
+        if query.evaluate_partial(model) is True:
             return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
-
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+        remaining = [name for name in symbols if name not in model]
+        if len(remaining) <= BATCH_SYMBOLS:
+            count = 1 << len(remaining)
+            mask = (1 << count) - 1
+            columns = dict(zip(remaining, enumeration_columns(len(remaining))))
+            values = [columns[name] if name in columns else mask if model[name] else 0
+                      for name in symbols]
+            nonlocal compiled
+            if compiled is None:
+                compiled = Implication(knowledge, query).compile(symbols)
+            return compiled.batch(values, count) == mask
+
+        p = choose(model)
+        for value in (True, False):
+            model[p] = value
+            entailed = check_all(model)
+            del model[p]
+            if not entailed:
+                return False
+        return True
+
+    return check_all(dict())
@@ -0,0 +1,351 @@
+"""
+CNF formulas and a CDCL SAT solver.
+
+Variables are positive integers and literals are v or -v, as in DIMACS;
+a clause is a list of literals. The solver does unit propagation with two
+watched literals per clause, learns a first-UIP clause from every conflict
+and backjumps, picks decisions by activity (VSIDS) with saved phases, and
+restarts on a geometric schedule. Clauses can be added between calls to
+`solve`, and `solve` takes assumptions, so one solver can answer many
+related queries.
+"""
+
+import heapq
+
+# Activity decay per conflict, and the bound above which activities are
+# scaled down
+DECAY = 0.95
+RESCALE = 1e100
+
+# Conflicts before the first restart, and the growth of that limit
+RESTART_FIRST = 100
+RESTART_GROWTH = 1.5
+
+
+class CNF():
+    """
+    A formula in conjunctive normal form, built clause by clause.
+    """
+
+    def __init__(self):
+        self.num_variables = 0
+        self.clauses = []
+
+        # Variable of each symbol name
+        self.variables = {}
+
+        # Literal of each encoded sentence, so shared subformulas are
+        # encoded once
+        self.encodings = {}
+
+        self.true_literal = None
+
+    def new_variable(self):
+        self.num_variables += 1
+        return self.num_variables
+
+    def variable(self, name):
+        """Returns the variable of a symbol name, creating it if needed."""
+        if name not in self.variables:
+            self.variables[name] = self.new_variable()
+        return self.variables[name]
+
+    def true(self):
+        """Returns a literal that is always true."""
+        if self.true_literal is None:
+            self.true_literal = self.new_variable()
+            self.add([self.true_literal])
+        return self.true_literal
+
+    def add(self, clause):
+        self.clauses.append(list(clause))
+
+
+class Solver(CNF):
+    """
+    A CNF that can be solved, optionally under assumed literals.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        # Indexed by variable: value (1 true, -1 false, 0 unassigned),
+        # decision level, reason clause, activity and saved phase
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [-1]
+
+        # Clauses watching each literal, indexed by `slot`
+        self.watches = [[], []]
+
+        self.trail = []
+        self.trail_limits = []
+        self.head = 0
+
+        # Assumptions of the last call to solve, one decision level each
+        self.assumed = []
+
+        # Heap of (-activity, variable) for decisions, and whether it holds
+        # an entry with each variable's current activity
+        self.order = []
+        self.queued = [False]
+        self.increment = 1.0
+        self.learnts = []
+        self.conflicts = 0
+
+        # Set once the clauses are unsatisfiable without assumptions
+        self.inconsistent = False
+
+        # Variable -> bool of the last satisfying assignment
+        self.model = None
+
+    def new_variable(self):
+        v = super().new_variable()
+        self.values.append(0)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phases.append(-1)
+        self.watches.append([])
+        self.watches.append([])
+        self.queued.append(False)
+        self.enqueue(v)
+        return v
+
+    def enqueue(self, v):
+        if not self.queued[v]:
+            heapq.heappush(self.order, (-self.activity[v], v))
+            self.queued[v] = True
+
+    @staticmethod
+    def slot(literal):
+        return 2 * literal if literal > 0 else -2 * literal + 1
+
+    def value(self, literal):
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add(self, clause):
+        """
+        Adds a clause. Literals already false at the top level are dropped.
+        """
+        super().add(clause)
+        if self.inconsistent:
+            return
+        self.backtrack(0)
+
+        literals = []
+        for literal in clause:
+            value = self.value(literal)
+            if value == 1 or -literal in literals:
+                return
+            if value == 0 and literal not in literals:
+                literals.append(literal)
+
+        if not literals:
+            self.inconsistent = True
+        elif len(literals) == 1:
+            self.assign(literals[0], None)
+            if self.propagate() is not None:
+                self.inconsistent = True
+        else:
+            self.watch(literals)
+
+    def watch(self, clause):
+        self.watches[self.slot(clause[0])].append(clause)
+        self.watches[self.slot(clause[1])].append(clause)
+
+    def assign(self, literal, reason):
+        v = abs(literal)
+        self.values[v] = 1 if literal > 0 else -1
+        self.levels[v] = len(self.trail_limits)
+        self.reasons[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by a unit clause. Returns a clause
+        with all literals false if there is a conflict, otherwise None.
+        The implied literal of a reason clause is its first.
+        """
+        values = self.values
+        while self.head < len(self.trail):
+            false_literal = -self.trail[self.head]
+            self.head += 1
+            watchers = self.watches[self.slot(false_literal)]
+            kept = []
+            for index, clause in enumerate(watchers):
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                first_value = values[abs(first)] if first > 0 else -values[abs(first)]
+                if first_value == 1:
+                    kept.append(clause)
+                    continue
+
+                # Look for a literal that is not false to watch instead
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    if (values[abs(literal)] if literal > 0 else -values[abs(literal)]) != -1:
+                        clause[1], clause[k] = literal, clause[1]
+                        self.watches[self.slot(literal)].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if first_value == -1:
+                        kept.extend(watchers[index + 1:])
+                        self.watches[self.slot(false_literal)] = kept
+                        return clause
+                    self.assign(first, clause)
+            self.watches[self.slot(false_literal)] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns the first-UIP clause learned from a conflict, with its
+        asserting literal first and a literal of the backjump level second,
+        and the level to backjump to.
+        """
+        level = len(self.trail_limits)
+        seen = set()
+        learnt = [None]
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for q in (clause if literal is None else clause[1:]):
+                v = abs(q)
+                if v not in seen and self.levels[v] > 0:
+                    seen.add(v)
+                    self.bump(v)
+                    if self.levels[v] == level:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[abs(literal)]
+        learnt[0] = -literal
+
+        if len(learnt) == 1:
+            return learnt, 0
+        deepest = max(range(1, len(learnt)), key=lambda i: self.levels[abs(learnt[i])])
+        learnt[1], learnt[deepest] = learnt[deepest], learnt[1]
+        return learnt, self.levels[abs(learnt[1])]
+
+    def bump(self, v):
+        self.activity[v] += self.increment
+        self.queued[v] = False
+        if self.activity[v] > RESCALE:
+            self.activity = [a / RESCALE for a in self.activity]
+            self.increment /= RESCALE
+            self.order = []
+            self.queued = [False] * len(self.activity)
+            for u in range(1, self.num_variables + 1):
+                if not self.values[u]:
+                    self.enqueue(u)
+        elif not self.values[v]:
+            self.enqueue(v)
+
+    def backtrack(self, level):
+        if len(self.trail_limits) <= level:
+            return
+        start = self.trail_limits[level]
+        for literal in self.trail[start:]:
+            v = abs(literal)
+            self.phases[v] = self.values[v]
+            self.values[v] = 0
+            self.reasons[v] = None
+            self.enqueue(v)
+        del self.trail[start:]
+        del self.trail_limits[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """
+        Returns the unassigned variable with the highest activity, or None
+        if every variable is assigned.
+        """
+        while self.order:
+            activity, v = heapq.heappop(self.order)
+            if -activity != self.activity[v]:
+                continue
+            self.queued[v] = False
+            if not self.values[v]:
+                return v
+        for v in range(1, self.num_variables + 1):
+            if not self.values[v]:
+                return v
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns whether the clauses together with the assumed literals are
+        satisfiable, setting `model` if they are.
+        """
+        self.model = None
+        if self.inconsistent:
+            return False
+
+        # Keep the levels of leading assumptions shared with the last call;
+        # everything on the trail was fully propagated when it returned
+        keep = 0
+        limit = min(len(assumptions), len(self.assumed), len(self.trail_limits))
+        while keep < limit and assumptions[keep] == self.assumed[keep]:
+            keep += 1
+        self.backtrack(keep)
+        self.assumed = list(assumptions)
+        restart_limit = RESTART_FIRST
+        conflicts = 0
+
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if not self.trail_limits:
+                    self.inconsistent = True
+                    return False
+                learnt, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.watch(learnt)
+                    self.learnts.append(learnt)
+                    self.assign(learnt[0], learnt)
+                self.increment /= DECAY
+                continue
+
+            if conflicts >= restart_limit:
+                conflicts = 0
+                restart_limit *= RESTART_GROWTH
+                self.backtrack(0)
+                continue
+
+            # Assumptions are the first decisions, one level each
+            level = len(self.trail_limits)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                value = self.value(literal)
+                if value == -1:
+                    return False
+                self.trail_limits.append(len(self.trail))
+                if value == 0:
+                    self.assign(literal, None)
+                continue
+
+            v = self.decide()
+            if v is None:
+                self.model = {u: self.values[u] == 1 for u in range(1, self.num_variables + 1)}
+                return True
+            self.trail_limits.append(len(self.trail))
+            self.assign(v if self.phases[v] > 0 else -v, None)
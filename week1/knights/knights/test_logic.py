@@ -0,0 +1,28 @@
+from logic import *
+
+
+def chain(n):
+    """Returns S0 and the n-deep chain S1 => (S2 => (... => S0))."""
+    symbols = [Symbol(f"S{i}") for i in range(n + 1)]
+    sentence = symbols[0]
+    for symbol in symbols[1:]:
+        sentence = Implication(symbol, sentence)
+    return symbols, sentence
+
+
+def test_deep_sentence_compiles():
+    symbols, sentence = chain(200)
+    compiled = sentence.compile()
+    model = {symbol.name: True for symbol in symbols}
+    assert compiled.evaluate(model) == sentence.evaluate(model)
+    model["S0"] = False
+    assert compiled.evaluate(model) == sentence.evaluate(model)
+    columns = enumeration_columns(3) + [0] * (len(compiled.symbols) - 3)
+    assert compiled.batch(columns, 8) == (1 << 8) - 1
+
+
+def test_deep_sentence_entailment():
+    symbols, sentence = chain(200)
+    assert truth_table_check(And(symbols[0]), sentence)
+    assert not truth_table_check(And(*symbols[1:]), sentence)
+    assert model_check(And(symbols[0]), sentence)
@@ -0,0 +1,168 @@
+import itertools
+import random
+
+from logic import *
+from sat import Solver
+
+
+def random_clauses(rng, num_variables, num_clauses):
+    clauses = []
+    for _ in range(num_clauses):
+        width = rng.randint(1, min(3, num_variables))
+        variables = rng.sample(range(1, num_variables + 1), width)
+        clauses.append([v if rng.random() < 0.5 else -v for v in variables])
+    return clauses
+
+
+def satisfies(values, clauses):
+    """Whether values, where values[v - 1] is variable v, satisfy every clause."""
+    return all(any(values[abs(l) - 1] == (l > 0) for l in clause)
+               for clause in clauses)
+
+
+def brute_force(num_variables, clauses):
+    return any(satisfies(values, clauses)
+               for values in itertools.product((False, True), repeat=num_variables))
+
+
+def check(solver, num_variables, clauses, assumptions=()):
+    expected = brute_force(num_variables, clauses + [[a] for a in assumptions])
+    assert solver.solve(assumptions) == expected
+    if expected:
+        values = tuple(solver.model[v] for v in range(1, num_variables + 1))
+        assert satisfies(values, clauses)
+        assert all(values[abs(a) - 1] == (a > 0) for a in assumptions)
+
+
+def test_solver_matches_brute_force():
+    rng = random.Random(0)
+    for _ in range(300):
+        num_variables = rng.randint(1, 8)
+        clauses = random_clauses(rng, num_variables, rng.randint(1, 40))
+        solver = Solver()
+        for _ in range(num_variables):
+            solver.new_variable()
+        for clause in clauses:
+            solver.add(clause)
+        check(solver, num_variables, clauses)
+
+
+def test_solver_with_assumptions():
+    # One solver answers many queries, with clauses added between them
+    rng = random.Random(1)
+    for _ in range(50):
+        num_variables = rng.randint(2, 8)
+        solver = Solver()
+        for _ in range(num_variables):
+            solver.new_variable()
+        clauses = []
+        for _ in range(10):
+            for clause in random_clauses(rng, num_variables, rng.randint(0, 4)):
+                clauses.append(clause)
+                solver.add(clause)
+            for _ in range(5):
+                variables = rng.sample(range(1, num_variables + 1),
+                                       rng.randint(0, num_variables))
+                assumptions = [v if rng.random() < 0.5 else -v for v in variables]
+                check(solver, num_variables, clauses, assumptions)
+
+
+def random_sentence(rng, symbols, depth):
+    if depth == 0 or rng.random() < 0.25:
+        symbol = rng.choice(symbols)
+        return Not(symbol) if rng.random() < 0.3 else symbol
+    kind = rng.randrange(5)
+    if kind == 0:
+        return Not(random_sentence(rng, symbols, depth - 1))
+    if kind == 1:
+        return And(*[random_sentence(rng, symbols, depth - 1)
+                     for _ in range(rng.randint(1, 3))])
+    if kind == 2:
+        return Or(*[random_sentence(rng, symbols, depth - 1)
+                    for _ in range(rng.randint(1, 3))])
+    if kind == 3:
+        return Implication(random_sentence(rng, symbols, depth - 1),
+                           random_sentence(rng, symbols, depth - 1))
+    return Biconditional(random_sentence(rng, symbols, depth - 1),
+                         random_sentence(rng, symbols, depth - 1))
+
+
+def entails(knowledge, query, symbols):
+    """Entailment by evaluating every model."""
+    for values in itertools.product((False, True), repeat=len(symbols)):
+        model = {symbol.name: value for symbol, value in zip(symbols, values)}
+        if knowledge.evaluate(model) and not query.evaluate(model):
+            return False
+    return True
+
+
+def test_model_check_matches_enumeration():
+    rng = random.Random(2)
+    symbols = [Symbol(name) for name in "ABCDE"]
+    for _ in range(300):
+        knowledge = And(*[random_sentence(rng, symbols, 3)
+                          for _ in range(rng.randint(1, 3))])
+        query = random_sentence(rng, symbols, 2)
+        expected = entails(knowledge, query, symbols)
+        assert model_check(knowledge, query) == expected
+        assert KnowledgeBase(knowledge).entails(query) == expected
+
+
+def test_knowledge_base_add_retract_query():
+    rng = random.Random(3)
+    symbols = [Symbol(name) for name in "ABCDE"]
+    for _ in range(30):
+        kb = KnowledgeBase()
+        sentences = []
+        pool = [random_sentence(rng, symbols, 2) for _ in range(6)]
+        for _ in range(20):
+            step = rng.random()
+            if step < 0.35:
+                sentence = rng.choice(pool)
+                kb.add(sentence)
+                if sentence not in sentences:
+                    sentences.append(sentence)
+            elif step < 0.55 and sentences:
+                # Retracted sentences may be added back later
+                sentence = rng.choice(sentences)
+                kb.retract(sentence)
+                sentences.remove(sentence)
+            assert kb.conjuncts == sentences
+            knowledge = And(*sentences)
+            for query in [random_sentence(rng, symbols, 2) for _ in range(3)]:
+                assert kb.entails(query) == entails(knowledge, query, symbols)
+                assert kb.entails(query) == truth_table_check(knowledge, query)
+            contradiction = And(symbols[0], Not(symbols[0]))
+            assert kb.satisfiable() == (not entails(knowledge, contradiction, symbols))
+
+
+def test_knowledge_base_answers_from_models():
+    a, b, c = Symbol("A"), Symbol("B"), Symbol("C")
+    kb = KnowledgeBase(And(Or(a, b), Implication(a, c)))
+    assert kb.satisfiable()
+    assert kb.models
+    calls = 0
+    solve = kb.solve
+
+    def counted(assumptions):
+        nonlocal calls
+        calls += 1
+        return solve(assumptions)
+
+    kb.solve = counted
+    for model in kb.models:
+        # A query false in a kept model is answered without the solver
+        query = Not(a) if model["A"] else a
+        assert not kb.entails(query)
+    assert calls == 0
+    assert kb.entails(Or(b, c))
+    assert calls == 1
+
+    # Retracting keeps the models; adding back a retracted sentence drops them
+    kb.retract(Implication(a, c))
+    assert kb.models
+    assert not kb.entails(Or(b, c))
+    kb.add(Implication(a, c))
+    assert not kb.models
+    assert kb.entails(Or(b, c))
+    assert Implication(a, c) in kb